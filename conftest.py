@@ -0,0 +1,22 @@
+"""Makes the field_friend package importable for the tests in `tests/`.
+
+Tests marked with `benchmark` measure wall-clock time and only run with `pytest --benchmark`.
+"""
+import pytest
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption('--benchmark', action='store_true', help='run the benchmarks marked with `benchmark`')
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line('markers', 'benchmark: wall-clock benchmark which only runs with --benchmark')
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='benchmarks only run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
@@ -7,10 +7,14 @@ from .field_provider import Field, FieldObstacle, FieldProvider, Row
 from .mowing import Mowing
 from .path_provider import Path, PathProvider
 from .path_recorder import PathRecorder
+from .plant import Plant
 from .plant_locator import DetectorError, PlantLocator
-from .plant_provider import PlantProvider
+from .plant_provider import PlantProvider, PlantsChange
+from .plant_store import PlantStore, PlantView
 from .puncher import Puncher
-from .sequence import find_sequence
+from .row_crop_index import RowCropIndex
+from .row_schedule import RowActionPlanner, WeedingAction
+from .sequence import find_lane_order, find_sequence
 from .weeding import Weeding
 from .weeding_new import WeedingNew
 
@@ -24,13 +28,21 @@ __all__ = [
     'Path',
     'PathProvider',
     'PathRecorder',
+    'Plant',
     'PlantLocator',
     'PlantProvider',
+    'PlantsChange',
+    'PlantStore',
+    'PlantView',
     'Puncher',
     'Row',
+    'RowActionPlanner',
+    'RowCropIndex',
     'DemoWeeding',
+    'find_lane_order',
     'find_sequence',
     'Weeding',
+    'WeedingAction',
     'WeedingNew',
     'BatteryWatcher',
     'CoinCollecting',
@@ -6,6 +6,7 @@ import rosys
 from rosys.geometry import Point
 
 from .plant import Plant
+from .plant_query import sort_plants
 
 if TYPE_CHECKING:
     from system import System
@@ -101,11 +102,9 @@ class CoinCollecting():
 
         param: backward: if True, crops behind the implement are returned
         """
-        relative_crop_positions = [self.system.odometer.prediction.relative_point(c.position)
-                                   for c in self.system.plant_provider.crops]
-        upcoming = [c for c in relative_crop_positions if c.x >= self.work_x+0.05]
-        upcoming.sort(key=lambda c: c.x)
-        return upcoming
+        upcoming = sort_plants(self.system.plant_provider.crops, self.system.odometer.prediction, order='x',
+                               mask=lambda points: points[:, 0] >= self.work_x + 0.05)
+        return [local_point for local_point, _ in upcoming]
 
     def create_simulated_plants(self):
         for i in range(1, 8):
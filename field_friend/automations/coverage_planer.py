@@ -2,14 +2,19 @@ import logging
 from typing import TYPE_CHECKING
 
 import numpy as np
+import shapely
 from shapely import affinity
-from shapely.geometry import LineString, MultiLineString, Polygon
+from shapely.geometry import LineString, Polygon
 from shapely.ops import unary_union
 
 if TYPE_CHECKING:
     from ..automations import Mowing
 
 
+LINESTRING = int(shapely.GeometryType.LINESTRING)
+MULTILINESTRING = int(shapely.GeometryType.MULTILINESTRING)
+
+
 class CoveragePlanner:
     OBSTACLE_PADDING = 0.7
 
@@ -47,7 +52,7 @@ class CoveragePlanner:
         if self.field.obstacles:  # Check if the obstacles list is not empty
             for obstacle in self.field.obstacles:
                 translated_obstacle = Polygon([(point.x - self.min_x, point.y - self.min_y)
-                                              for point in obstacle.points])
+                                              for point in obstacle.points(self.field.reference)])
                 rotated_obstacle = affinity.rotate(translated_obstacle, -self.theta, origin=(0, 0), use_radians=True)
                 padded_obstacle = rotated_obstacle.buffer(
                     self.mowing.padding + self.mowing.turning_radius + self.OBSTACLE_PADDING)
@@ -84,55 +89,43 @@ class CoveragePlanner:
         self.log.info(f'corrected lane distance: {self.mowing.lane_distance}')
 
     def _determine_inner_lanes(self) -> list[list[LineString]]:
-        lanes_groups = []  # List to hold lists of lanes
-        current_groups = [[]]  # Current groups of lanes
+        """Intersect all lanes with the navigable area at once and group them by the number of segments per lane."""
+        count = int(np.ceil((self.max_perp_proj - self.min_perp_proj) / self.mowing.lane_distance)) + 2
+        lengths = np.cumsum([self.min_perp_proj] + [self.mowing.lane_distance] * (count - 1))  # sequential float sums
+        lengths = lengths[lengths <= self.max_perp_proj]
+        offsets = np.array(self.p1) + lengths[:, None] * self.perp_direction
+        coords = np.stack([offsets + self.min_proj * self.direction, offsets + self.max_proj * self.direction], axis=1)
+        shapely.prepare(self.navigable_area)
+        intersections = shapely.intersection(shapely.linestrings(coords), self.navigable_area)
+        type_ids = shapely.get_type_id(intersections)
+
+        lanes_groups: list[list[LineString]] = []  # List to hold lists of lanes
+        current_groups: list[list[LineString]] = [[]]  # Current groups of lanes
         is_multiline = False
-
-        length = self.min_perp_proj
-        while length <= self.max_perp_proj:
-            start_point = np.array(self.p1) + length * self.perp_direction + self.min_proj * self.direction
-            end_point = np.array(self.p1) + length * self.perp_direction + self.max_proj * self.direction
-            line = LineString([start_point, end_point])
-
-            # Intersect the line with the inverse of the obstacle polygon
-            intersection = self.navigable_area.intersection(line)
-            if intersection and not intersection.is_empty:
-                if isinstance(intersection, MultiLineString):
-                    if not current_groups or len(current_groups) != len(intersection.geoms):
-                        for group in current_groups:
-                            lanes_groups.append(group)
-                        current_groups = [[] for _ in range(len(intersection.geoms))]
-                    for i, line_segment in enumerate(intersection.geoms):
-                        current_groups[i].append(line_segment)
-                    is_multiline = True
-                elif isinstance(intersection, LineString):
-                    if is_multiline:
-                        for group in current_groups:
-                            lanes_groups.append(group)
-                        current_groups = [[]]  # Create new group for LineString
-                        is_multiline = False
-                    current_groups[0].append(intersection)
-
-            length += self.mowing.lane_distance
-
-        for group in current_groups:
-            lanes_groups.append(group)
-
-        lanes_groups = [
-            [affinity.translate(  # Translating the lanes back to their original position
-                affinity.rotate(  # Rotating the lanes back to their original orientation
-                    line,
-                    self.theta,
-                    origin=(0, 0),
-                    use_radians=True
-                ),
-                xoff=self.min_x,
-                yoff=self.min_y
-            ) for line in group]
-            for group in lanes_groups
-        ]
-
-        return lanes_groups
+        for intersection, type_id in zip(intersections, type_ids):
+            if type_id == MULTILINESTRING:
+                segments = shapely.get_parts(intersection)
+                if len(current_groups) != len(segments):
+                    lanes_groups.extend(current_groups)
+                    current_groups = [[] for _ in range(len(segments))]
+                for i, line_segment in enumerate(segments):
+                    current_groups[i].append(line_segment)
+                is_multiline = True
+            elif type_id == LINESTRING and not intersection.is_empty:
+                if is_multiline:
+                    lanes_groups.extend(current_groups)
+                    current_groups = [[]]  # Create new group for LineString
+                    is_multiline = False
+                current_groups[0].append(intersection)
+        lanes_groups.extend(current_groups)
+
+        # Rotate and translate all lanes back to their original position in one transformation
+        rotation = np.array([[np.cos(self.theta), -np.sin(self.theta)], [np.sin(self.theta), np.cos(self.theta)]])
+        offset = np.array([self.min_x, self.min_y])
+        lanes = shapely.transform(np.array([line for group in lanes_groups for line in group], dtype=object),
+                                  lambda points: points @ rotation.T + offset)
+        sizes = np.cumsum([0] + [len(group) for group in lanes_groups])
+        return [list(lanes[sizes[i]:sizes[i + 1]]) for i in range(len(lanes_groups))]
 
     def _determine_outer_lanes(self) -> list[list[LineString]]:
         # Create line segments along the outline
@@ -1,6 +1,6 @@
 import logging
 import random
-from typing import Callable, Literal
+from typing import Literal, Optional, Union
 
 import numpy as np
 import rosys
@@ -10,9 +10,12 @@ from rosys.helpers import eliminate_pi, ramp
 from rosys.vision import Detector
 
 from ..hardware import FieldFriend
+from . import plant_query
 from .plant import Plant
 from .plant_locator import DetectorError, PlantLocator
 from .plant_provider import PlantProvider
+from .plant_query import PointMask
+from .plant_store import PlantStore, PlantView
 from .puncher import Puncher
 
 CAMERA_UNCERTAINTY = 0.01
@@ -61,31 +64,28 @@ class DemoWeeding:
         self.plant_provider.clear_weeds()
         await self.plant_detector.detect_plants(self.camera_selector.cameras['bottom cam'])
         for local_point, weed in self.sort_plants(self.plant_provider.weeds, order='y',
-                                                  filter=self.field_friend.can_reach):
+                                                  mask=self.field_friend.can_reach_points):
             self.log.info(f'Punching weed at {weed.position} and {local_point}...')
             await self.puncher.punch(local_point.y, self.drill_depth)
-            self.plant_provider.remove_weed(weed)
+            self.plant_provider.remove_weed(weed.id)
 
     def sort_plants(self,
-                    plants: list[Plant],
+                    plants: Union[PlantStore, list[Plant]],
                     order: Literal['x', 'y'],
-                    filter: Callable[[Point], bool] = lambda _: True,
+                    mask: Optional[PointMask] = None,
                     reverse: bool = False,
-                    ) -> list[tuple[Point, Plant]]:
-        """Sort and filter plants by local x or y coordinate."""
-        local_plants: list[tuple[Point, Plant]] = []
-        for plant in plants:
-            local_point = self.driver.odometer.prediction.relative_point(plant.position)
-            if filter(local_point):
-                local_plants.append((local_point, plant))
-        return sorted(local_plants, key=lambda p: p[0].x if order == 'x' else p[0].y, reverse=reverse)
+                    ) -> list[tuple[Point, Union[Plant, PlantView]]]:
+        """Sort and filter plants by local x or y coordinate (the mask is evaluated on an Nx2 array of local points)."""
+        return plant_query.sort_plants(plants, self.driver.odometer.prediction, order, mask, reverse)
 
     async def drive_to_next_weed(self) -> None:
         self.log.info('Driving to next weed...')
-        crops = self.sort_plants(self.plant_provider.crops, order='x', filter=lambda p: p.x > self.field_friend.WORK_X)
-        weeds = self.sort_plants(self.plant_provider.weeds, order='x', filter=lambda p: p.x > self.field_friend.WORK_X +
-                                 self.field_friend.DRILL_RADIUS and self.field_friend.y_axis.MIN_POSITION <= p.y <= self.
-                                 field_friend.y_axis.MAX_POSITION)
+        crops = self.sort_plants(self.plant_provider.crops, order='x',
+                                 mask=lambda points: points[:, 0] > self.field_friend.WORK_X)
+        weeds = self.sort_plants(self.plant_provider.weeds, order='x',
+                                 mask=lambda points: (points[:, 0] > self.field_friend.WORK_X + self.field_friend.DRILL_RADIUS) &
+                                 (points[:, 1] >= self.field_friend.y_axis.MIN_POSITION) &
+                                 (points[:, 1] <= self.field_friend.y_axis.MAX_POSITION))
         if crops:
             line = Line.from_points(self.driver.odometer.prediction.point, crops[0][1].position)
             self.log.info(f'Found crop, driving in direction of {crops[0][1].position}')
@@ -1,12 +1,32 @@
-from dataclasses import dataclass, field
+import json
+import logging
+import os
+from dataclasses import dataclass, field, replace
+from pathlib import Path
 from typing import Any, Literal, Optional, TypedDict, Union
-from functools import lru_cache
+
 import rosys
 from rosys.geometry import Point
 
-from field_friend.navigation.point_transformation import wgs84_to_cartesian
+from field_friend.navigation.point_transformation import local_projection
 
 from .plant import Plant
+from .row_crop_index import RowCropIndex
+
+FIELDS_PATH = Path('~/.rosys/fields').expanduser()
+PLANT_COLUMNS = ('id', 'type', 'detection_time', 'confidence', 'observations', 'weight', 'variance', 'last_seen')
+
+def cartesian_points(cache: dict, reference_point: list, points_wgs84: list[list]) -> list[Point]:
+    """Convert WGS84 points into local coordinates relative to the reference point.
+
+    The result is kept in the given cache and reused as long as neither the reference point nor the WGS84 points change.
+    """
+    key = (tuple(reference_point), tuple(tuple(point) for point in points_wgs84))
+    if cache.get('key') != key:
+        cache['key'] = key
+        cartesian = local_projection(*reference_point).to_cartesian(points_wgs84) if points_wgs84 else []
+        cache['points'] = [Point(x=float(x), y=float(y)) for x, y in cartesian]
+    return cache['points']
 
 
 @dataclass(slots=True, kw_only=True)
@@ -14,17 +34,11 @@ class FieldObstacle:
     id: str
     name: str
     points_wgs84: list[list] = field(default_factory=list)
+    _cartesian: dict = field(default_factory=dict, repr=False, compare=False, metadata=rosys.persistence.exclude)
 
-    @lru_cache(maxsize=None)
     def points(self, reference_point: list) -> list[Point]:
-        if len(self.points_wgs84) > 0:
-            cartesian_points = []
-            for point in self.points_wgs84:
-                cartesian_point = wgs84_to_cartesian([reference_point[0], reference_point[1]], point)
-                cartesian_points.append(Point(x=cartesian_point[0], y=cartesian_point[1]))
-            return cartesian_points
-        else:
-            return []
+        """Obstacle outline in local coordinates (cached, do not modify the returned list)."""
+        return cartesian_points(self._cartesian, reference_point, self.points_wgs84)
 
 
 @dataclass(slots=True, kw_only=True)
@@ -34,17 +48,24 @@ class Row:
     points_wgs84: list[list] = field(default_factory=list)
     reverse: bool = False
     crops: list[Plant] = field(default_factory=list)
+    _cartesian: dict = field(default_factory=dict, repr=False, compare=False, metadata=rosys.persistence.exclude)
+    _crop_index: Optional[RowCropIndex] = field(default=None, repr=False, compare=False,
+                                                metadata=rosys.persistence.exclude)
 
-    @lru_cache(maxsize=None)
     def points(self, reference_point: list) -> list[Point]:
-        if len(self.points_wgs84) > 0:
-            cartesian_points = []
-            for point in self.points_wgs84:
-                cartesian_point = wgs84_to_cartesian([reference_point[0], reference_point[1]], point)
-                cartesian_points.append(Point(x=cartesian_point[0], y=cartesian_point[1]))
-            return cartesian_points
-        else:
-            return []
+        """Row points in local coordinates (cached, do not modify the returned list)."""
+        return cartesian_points(self._cartesian, reference_point, self.points_wgs84)
+
+    def crop_index(self, reference_point: list) -> RowCropIndex:
+        """Crops indexed by their station along the row (cached, sorts `crops` by station).
+
+        Insert and remove crops through the index to keep it valid.
+        """
+        points = self.points(reference_point)
+        if self._crop_index is None or self._crop_index.points is not points or \
+                self._crop_index.crops is not self.crops or not self._crop_index.is_valid:
+            self._crop_index = RowCropIndex(points, self.crops)
+        return self._crop_index
 
     def reversed(self):
         return Row(
@@ -64,17 +85,49 @@ class Field:
     visualized: bool = False
     obstacles: list[FieldObstacle] = field(default_factory=list)
     rows: list[Row] = field(default_factory=list)
+    _cartesian: dict = field(default_factory=dict, repr=False, compare=False, metadata=rosys.persistence.exclude)
+
+    @property
+    def reference(self) -> list:
+        return [self.reference_lat, self.reference_lon]
 
     @property
     def outline(self) -> list[Point]:
-        if len(self.outline_wgs84) > 0:
-            cartesian_outline = []
-            for point in self.outline_wgs84:
-                cartesian_point = wgs84_to_cartesian([self.reference_lat, self.reference_lon], point)
-                cartesian_outline.append(Point(x=cartesian_point[0], y=cartesian_point[1]))
-            return cartesian_outline
+        """Field outline in local coordinates (cached, do not modify the returned list)."""
+        return cartesian_points(self._cartesian, self.reference, self.outline_wgs84)
+
+
+def plants_to_columns(plants: list[Plant]) -> dict[str, list]:
+    """Store plants column by column, which is much more compact than one dict per plant."""
+    columns = {name: [getattr(plant, name) for plant in plants] for name in PLANT_COLUMNS}
+    columns['x'] = [plant.position.x for plant in plants]
+    columns['y'] = [plant.position.y for plant in plants]
+    return columns
+
+
+def plants_from_columns(columns: dict[str, list]) -> list[Plant]:
+    return [Plant(position=Point(x=columns['x'][i], y=columns['y'][i]), **{name: columns[name][i] for name in PLANT_COLUMNS})
+            for i in range(len(columns['id']))]
+
+
+def field_to_dict(f: Field) -> dict[str, Any]:
+    data = rosys.persistence.to_dict(replace(f, rows=[]))
+    data['rows'] = [{**rosys.persistence.to_dict(replace(row, crops=[])), 'crops': plants_to_columns(row.crops)}
+                    for row in f.rows]
+    return data
+
+
+def field_from_dict(data: dict[str, Any]) -> Field:
+    f = rosys.persistence.from_dict(Field, {**data, 'rows': []})
+    for row_data in data.get('rows', []):
+        crops = row_data.get('crops', [])
+        row = rosys.persistence.from_dict(Row, {**row_data, 'crops': []})
+        if isinstance(crops, dict):
+            row.crops = plants_from_columns(crops)
         else:
-            return []
+            row.crops = [rosys.persistence.from_dict(Plant, crop) for crop in crops]
+        f.rows.append(row)
+    return f
 
 
 class Active_object(TypedDict):
@@ -83,8 +136,16 @@ class Active_object(TypedDict):
 
 
 class FieldProvider(rosys.persistence.PersistentModule):
+    """Provides the fields and persists each of them in a separate file.
+
+    The module backup only contains the ids of the fields, the export contains the complete fields.
+    A field file is only rewritten if the field has been passed to `invalidate` (or all fields if none was passed).
+    Files which cannot be loaded are neither deleted nor dropped from the backup, so they can be repaired.
+    """
+
     def __init__(self) -> None:
         super().__init__()
+        self.log = logging.getLogger('field_friend.field_provider')
         self.fields: list[Field] = []
         self.active_field: Optional[Field] = None
         self.active_object: Optional[Active_object] = None
@@ -99,29 +160,74 @@ class FieldProvider(rosys.persistence.PersistentModule):
         """The dict of fields has changed."""
 
         self.needs_backup: bool = False
+        self._changed_field_ids: set[str] = set()
+        self._unreadable_field_ids: set[str] = set()
+        self._removed_field_ids: set[str] = set()
 
     def backup(self) -> dict:
-        return {'fields': rosys.persistence.to_dict(self.fields)}
+        FIELDS_PATH.mkdir(parents=True, exist_ok=True)
+        for f in self.fields:
+            if f.id in self._changed_field_ids:
+                self._write_field(f)
+        self._changed_field_ids.clear()
+        field_ids = [f.id for f in self.fields] + sorted(self._unreadable_field_ids)
+        # only delete files of explicitly removed fields, so a missing or outdated backup can never wipe the others
+        for field_id in self._removed_field_ids.difference(field_ids):
+            (FIELDS_PATH / f'{field_id}.json').unlink(missing_ok=True)
+        self._removed_field_ids.clear()
+        return {'field_ids': field_ids}
+
+    def export(self) -> dict:
+        """Return a backup which contains the complete fields instead of references to their files."""
+        return {'fields': [field_to_dict(f) for f in self.fields]}
 
     def restore(self, data: dict[str, Any]) -> None:
-        rosys.persistence.replace_list(self.fields, Field, data.get('fields', []))
-
-    def invalidate(self) -> None:
+        if 'fields' in data:  # backups containing all fields, e.g. an export
+            self.fields[:] = [field_from_dict(field_data) for field_data in data['fields']]
+            self._changed_field_ids = {f.id for f in self.fields}
+            self._unreadable_field_ids.clear()
+            self.request_backup()
+            return
+        fields = []
+        self._unreadable_field_ids.clear()
+        for field_id in data.get('field_ids', []):
+            try:
+                fields.append(field_from_dict(json.loads((FIELDS_PATH / f'{field_id}.json').read_text())))
+            except Exception as e:
+                self.log.error(f'could not restore field {field_id}: {e}')
+                self._unreadable_field_ids.add(field_id)
+        self.fields[:] = fields
+
+    @staticmethod
+    def _write_field(f: Field) -> None:
+        """Write the field file atomically, so an interrupted backup cannot leave a truncated file behind."""
+        filepath = FIELDS_PATH / f'{f.id}.json'
+        temporary_filepath = filepath.with_suffix('.json.tmp')
+        temporary_filepath.write_text(json.dumps(field_to_dict(f)))
+        os.replace(temporary_filepath, filepath)
+
+    def invalidate(self, *, field: Optional[Field] = None) -> None:
+        """Request a backup of the given field (or of all fields) and notify about the change."""
+        self._changed_field_ids.update([field.id] if field is not None else [f.id for f in self.fields])
         self.request_backup()
         self.FIELDS_CHANGED.emit()
 
     def add_field(self, field: Field) -> None:
         self.fields.append(field)
-        self.invalidate()
+        self.invalidate(field=field)
 
     def remove_field(self, field: Field) -> None:
         self.fields.remove(field)
+        self._removed_field_ids.add(field.id)
         self.active_field = None
         self.active_object = None
         self.OBJECT_SELECTED.emit()
         self.invalidate()
 
     def clear_fields(self) -> None:
+        self._removed_field_ids.update(f.id for f in self.fields)
+        self._removed_field_ids.update(self._unreadable_field_ids)
+        self._unreadable_field_ids.clear()
         self.fields.clear()
         self.active_field = None
         self.active_object = None
@@ -130,23 +236,23 @@ class FieldProvider(rosys.persistence.PersistentModule):
 
     def add_obstacle(self, field: Field, obstacle: FieldObstacle) -> None:
         field.obstacles.append(obstacle)
-        self.invalidate()
+        self.invalidate(field=field)
 
     def remove_obstacle(self, field: Field, obstacle: FieldObstacle) -> None:
         field.obstacles.remove(obstacle)
         self.active_object = None
         self.OBJECT_SELECTED.emit()
-        self.invalidate()
+        self.invalidate(field=field)
 
     def add_row(self, field: Field, row: Row) -> None:
         field.rows.append(row)
-        self.invalidate()
+        self.invalidate(field=field)
 
     def remove_row(self, field: Field, row: Row) -> None:
         field.rows.remove(row)
         self.active_object = None
         self.OBJECT_SELECTED.emit()
-        self.invalidate()
+        self.invalidate(field=field)
 
     def select_field(self, field: Optional[Field] = None) -> None:
         self.active_field = field
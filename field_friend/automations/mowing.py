@@ -1,10 +1,14 @@
 
+import hashlib
+import json
 import logging
+import os
+from pathlib import Path
 from typing import Any, Optional
 
 import numpy as np
 import rosys
-from rosys.geometry import Pose, Spline
+from rosys.geometry import Point, Pose, Spline
 from rosys.helpers import angle
 from shapely.geometry import LineString
 
@@ -12,7 +16,39 @@ from ..hardware import FieldFriend
 from ..navigation import Gnss
 from .coverage_planer import CoveragePlanner
 from .field_provider import Field, FieldProvider
-from .sequence import find_sequence
+from .sequence import find_lane_order, lane_offsets
+
+PLANS_PATH = Path('~/.rosys/mowing_plans').expanduser()
+ACTIVE_PLAN_PATH = PLANS_PATH / 'active.json'
+
+
+def segments_to_compact(segments: list[rosys.driving.PathSegment]) -> list[list[float]]:
+    """Encode path segments as lists of their spline control point coordinates and backward flag."""
+    return [[segment.spline.start.x, segment.spline.start.y, segment.spline.control1.x, segment.spline.control1.y,
+             segment.spline.control2.x, segment.spline.control2.y, segment.spline.end.x, segment.spline.end.y,
+             int(segment.backward)] for segment in segments]
+
+
+def segments_from_compact(data: list[list[float]]) -> list[rosys.driving.PathSegment]:
+    return [rosys.driving.PathSegment(spline=Spline(start=Point(x=values[0], y=values[1]),
+                                                    control1=Point(x=values[2], y=values[3]),
+                                                    control2=Point(x=values[4], y=values[5]),
+                                                    end=Point(x=values[6], y=values[7])),
+                                      backward=bool(values[8])) for values in data]
+
+
+def plan_to_dict(paths: list[list[rosys.driving.PathSegment]],
+                 transits: list[Optional[list[rosys.driving.PathSegment]]]) -> dict[str, Any]:
+    return {
+        'paths': [segments_to_compact(path) for path in paths],
+        'transits': [segments_to_compact(transit) if transit else None for transit in transits],
+    }
+
+
+def plan_from_dict(data: dict[str, Any]) -> tuple[list[list[rosys.driving.PathSegment]],
+                                                  list[Optional[list[rosys.driving.PathSegment]]]]:
+    return ([segments_from_compact(path) for path in data['paths']],
+            [segments_from_compact(transit) if transit else None for transit in data['transits']])
 
 
 class Mowing(rosys.persistence.PersistentModule):
@@ -36,37 +72,111 @@ class Mowing(rosys.persistence.PersistentModule):
 
         self.field: Optional[Field] = None
         self.paths: Optional[list[list[rosys.driving.PathSegment]]] = None
-        self.current_path: Optional[list[rosys.driving.PathSegment]] = None
-        self.current_path_segment: Optional[rosys.driving.PathSegment] = None
+        self.plan: Optional[dict[str, Any]] = None
+        """compact form of the current paths and transits, kept in its own file so that mowing can be resumed"""
+        self.plan_id: Optional[str] = None
+        """content hash of the current plan, which is part of the backup instead of the plan itself"""
+        self.path_index: Optional[int] = None
+        """index of the path which is currently driven"""
+        self.segment_index: Optional[int] = None
+        """index of the segment which is currently driven within the current path"""
+        self.transits: list[Optional[list[rosys.driving.PathSegment]]] = []
+        """precomputed transit from the end of the previous path to the start of each path (None if not available)"""
+        self.transit_tolerance: float = 0.3
+        """maximum distance of the robot from the planned transit start (m)"""
+        self.transit_yaw_tolerance: float = np.deg2rad(20)
+        """maximum yaw deviation of the robot from the planned transit start (rad)"""
         self.continue_mowing: bool = False
+        self.plan_cache: dict[str, dict[str, Any]] = {}
+        """geometry hash and parameter keys of the cached plan file of each field id"""
 
         self.MOWING_STARTED = rosys.event.Event()
         """Mowing has started."""
 
         self.needs_backup = False
+        self.field_provider.FIELDS_CHANGED.register(self._prune_plan_cache)
 
     def backup(self) -> dict:
         return {
             'padding': self.padding,
             'lane_distance': self.lane_distance,
-            'paths': [[rosys.persistence.to_dict(segment) for segment in path] for path in self.paths] if self.paths else [],
-            'current_path': [rosys.persistence.to_dict(segment) for segment in self.current_path] if self.current_path else [],
-            'current_path_segment': rosys.persistence.to_dict(self.current_path_segment) if self.current_path_segment else None,
+            'plan_id': self.plan_id,
+            'path_index': self.path_index,
+            'segment_index': self.segment_index,
+            'plan_cache': {
+                field_id: {'geometry': entry['geometry'], 'parameters': entry['parameters']}
+                for field_id, entry in self.plan_cache.items()
+            },
         }
 
+    def export(self) -> dict:
+        """Return a backup which contains the current plan instead of a reference to its file."""
+        return {**self.backup(), 'plan': self.plan}
+
     def restore(self, data: dict[str, Any]) -> None:
         self.padding = data.get('padding', self.padding)
         self.lane_distance = data.get('lane_distance', self.lane_distance)
-        paths_data = data.get('paths', [])
-        self.paths = [
-            [rosys.persistence.from_dict(rosys.driving.PathSegment, segment_data) for segment_data in path_data]
-            for path_data in paths_data
-        ]
-        current_path_data = data.get('current_path', [])
-        self.current_path = [rosys.persistence.from_dict(
-            rosys.driving.PathSegment, segment_data) for segment_data in current_path_data]
-        self.current_path_segment = rosys.persistence.from_dict(
-            rosys.driving.PathSegment, data['current_path_segment']) if data['current_path_segment'] else None
+        self.plan_cache = {
+            field_id: {'geometry': entry['geometry'], 'parameters': entry['parameters']}
+            for field_id, entry in data.get('plan_cache', {}).items()
+        }
+        plan = data.get('plan')
+        if isinstance(plan, str):  # the plan used to be referenced by the id of its cache file
+            plan = self._read_plan(plan)
+        if plan is not None:  # backups containing the plan itself, e.g. an export
+            self.plan, self.plan_id = plan, self._plan_id(plan)
+            self._write_active_plan(self.plan_id, self.plan)
+            self.request_backup()
+        else:
+            self.plan_id = data.get('plan_id')
+            self.plan = self._read_active_plan(self.plan_id) if self.plan_id else None
+            if self.plan is None:
+                self.plan_id = None
+        self.paths, self.transits = plan_from_dict(self.plan) if self.plan else (None, [])
+        self.path_index = data.get('path_index') if self.paths else None
+        self.segment_index = data.get('segment_index') if self.paths else None
+
+    @property
+    def current_path(self) -> Optional[list[rosys.driving.PathSegment]]:
+        if self.paths is None or self.path_index is None or self.path_index >= len(self.paths):
+            return None
+        return self.paths[self.path_index]
+
+    @staticmethod
+    def _write_plan(field_id: str, plan: dict[str, Any]) -> None:
+        """Cache a plan for later runs on the same field; this happens once per generated plan."""
+        PLANS_PATH.mkdir(parents=True, exist_ok=True)
+        (PLANS_PATH / f'{field_id}.json').write_text(json.dumps(plan))
+
+    def _read_plan(self, field_id: str) -> Optional[dict[str, Any]]:
+        try:
+            return json.loads((PLANS_PATH / f'{field_id}.json').read_text())
+        except (OSError, ValueError) as e:
+            self.log.warning(f'could not read mowing plan of field {field_id}: {e}')
+            return None
+
+    @staticmethod
+    def _plan_id(plan: dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(plan).encode()).hexdigest()
+
+    @staticmethod
+    def _write_active_plan(plan_id: str, plan: dict[str, Any]) -> None:
+        """Write the plan which is currently driven atomically; this happens once per started plan, not per segment."""
+        PLANS_PATH.mkdir(parents=True, exist_ok=True)
+        temporary_path = ACTIVE_PLAN_PATH.with_suffix('.json.tmp')
+        temporary_path.write_text(json.dumps({'id': plan_id, 'plan': plan}))
+        os.replace(temporary_path, ACTIVE_PLAN_PATH)
+
+    def _read_active_plan(self, plan_id: str) -> Optional[dict[str, Any]]:
+        try:
+            data = json.loads(ACTIVE_PLAN_PATH.read_text())
+        except (OSError, ValueError) as e:
+            self.log.warning(f'could not read active mowing plan: {e}')
+            return None
+        if data.get('id') != plan_id:
+            self.log.warning('active mowing plan does not match the backup')
+            return None
+        return data.get('plan')
 
     def invalidate(self) -> None:
         self.request_backup()
@@ -106,10 +216,13 @@ class Mowing(rosys.persistence.PersistentModule):
                     self.path_planner.areas.clear()
                     for obstacle in self.field.obstacles:
                         self.path_planner.obstacles[obstacle.id] = rosys.pathplanning.Obstacle(
-                            id=obstacle.id, outline=obstacle.points)
+                            id=obstacle.id, outline=obstacle.points(self.field.reference))
                     area = rosys.pathplanning.Area(id=f'{self.field.id}', outline=self.field.outline)
                     self.path_planner.areas = {area.id: area}
-                    self.paths = self._generate_mowing_path()
+                    self.plan = await self._get_mowing_plan()
+                    self.plan_id = self._plan_id(self.plan)
+                    await rosys.run.io_bound(self._write_active_plan, self.plan_id, self.plan)
+                    self.paths, self.transits = plan_from_dict(self.plan)
                     self.invalidate()
                     if not self.paths:
                         rosys.notify('No paths to drive', 'negative')
@@ -123,6 +236,59 @@ class Mowing(rosys.persistence.PersistentModule):
                 rosys.notify(f'Mowing failed because of {e}', 'negative')
                 break
 
+    async def _get_mowing_plan(self) -> dict[str, Any]:
+        """Return the cached plan for the current field and parameters or generate and cache a new one."""
+        geometry = self._geometry_hash(self.field)
+        parameters = self._parameters_key()
+        entry = self.plan_cache.get(self.field.id)
+        if entry is not None and entry['geometry'] == geometry and parameters in entry['parameters']:
+            plan = await rosys.run.io_bound(self._read_plan, self.field.id)
+            if plan is not None:
+                self.log.info('using cached mowing path')
+                return plan
+        paths = self._generate_mowing_path()
+        # the coverage planner adjusts the lane distance, so the plan is also valid for the adjusted parameters
+        parameters = sorted({parameters, self._parameters_key()})
+        plan = plan_to_dict(paths, await self._plan_transits(paths))
+        await rosys.run.io_bound(self._write_plan, self.field.id, plan)
+        self.plan_cache[self.field.id] = {'geometry': geometry, 'parameters': parameters}
+        return plan
+
+    async def _plan_transits(self, paths: list[list[rosys.driving.PathSegment]]) -> list[Optional[list[rosys.driving.PathSegment]]]:
+        """Plan the transits between consecutive paths in advance so that the robot does not wait for the path planner."""
+        transits: list[Optional[list[rosys.driving.PathSegment]]] = [None] if paths else []
+        for previous_path, path in zip(paths, paths[1:]):
+            try:
+                transit = await self.path_planner.search(start=previous_path[-1].spline.pose(1),
+                                                         goal=path[0].spline.pose(0), timeout=30)
+            except Exception as e:
+                self.log.warning(f'could not plan transit in advance: {e}')
+                transit = None
+            transits.append(transit or None)
+        return transits
+
+    @staticmethod
+    def _geometry_hash(field: Field) -> str:
+        geometry = [field.outline_wgs84, field.reference, [obstacle.points_wgs84 for obstacle in field.obstacles]]
+        return hashlib.sha256(json.dumps(geometry).encode()).hexdigest()
+
+    def _parameters_key(self) -> str:
+        return json.dumps([self.padding, self.lane_distance, self.num_outer_lanes, self.turning_radius])
+
+    def _prune_plan_cache(self) -> None:
+        """Drop cached plans of fields which have been removed or whose geometry has changed.
+
+        The current plan is kept in its own file, so mowing can still be resumed from where it stopped.
+        """
+        fields = {field.id: field for field in self.field_provider.fields}
+        outdated = [field_id for field_id, entry in self.plan_cache.items()
+                    if field_id not in fields or self._geometry_hash(fields[field_id]) != entry['geometry']]
+        for field_id in outdated:
+            del self.plan_cache[field_id]
+            (PLANS_PATH / f'{field_id}.json').unlink(missing_ok=True)
+        if outdated:
+            self.invalidate()
+
     def _generate_mowing_path(self) -> list[list[rosys.driving.PathSegment]]:
         self.log.info('generating mowing path')
         lane_groups, outer_lanes_groups = self.coverage_planner.decompose_into_lanes()
@@ -162,20 +328,23 @@ class Mowing(rosys.persistence.PersistentModule):
     async def _drive_mowing_paths(self, paths: list[list[rosys.driving.PathSegment]]) -> None:
         if not paths:
             raise Exception('no paths to drive')
-        if self.continue_mowing:
-            first_path = self.current_path
+        if self.continue_mowing and self.path_index is not None and self.path_index < len(paths):
+            first_path_index, first_segment_index = self.path_index, self.segment_index or 0
         else:
-            first_path = paths[0]
-        await self.driver.drive_to(first_path[0].spline.start)
-        for path in paths:
-            if self.continue_mowing and path != self.current_path:
-                continue
-            self.current_path = path
+            first_path_index, first_segment_index = 0, 0
+        self.continue_mowing = False
+        await self.driver.drive_to(paths[first_path_index][0].spline.start)
+        for index in range(first_path_index, len(paths)):
+            path = paths[index]
+            self.path_index = index
+            self.segment_index = None
             self.invalidate()
-            if path != first_path:
+            if index != first_path_index:
                 start_pose = self.driver.odometer.prediction
                 end_pose = path[0].spline.pose(0)
-                path_switch = await self.path_planner.search(start=start_pose, goal=end_pose, timeout=30)
+                path_switch = self._precomputed_transit(index, paths, start_pose)
+                if path_switch is None:
+                    path_switch = await self.path_planner.search(start=start_pose, goal=end_pose, timeout=30)
                 if path_switch is None:
                     self.log.warning('not driving because no path to start point found')
                     raise Exception('no path to start point found')
@@ -189,34 +358,30 @@ class Mowing(rosys.persistence.PersistentModule):
                 self.driver.parameters.hook_offset = 0.6
                 self.driver.parameters.carrot_distance = 0.2
                 self.driver.parameters.carrot_offset = self.driver.parameters.hook_offset + self.driver.parameters.carrot_distance
-            for segment in path:
-                if self.continue_mowing:
-                    if segment == self.current_path_segment:
-                        self.continue_mowing = False
-                    else:
-                        continue
-                self.current_path_segment = segment
+            for segment_index in range(first_segment_index if index == first_path_index else 0, len(path)):
+                segment = path[segment_index]
+                self.segment_index = segment_index
                 self.invalidate()
                 await self.driver.drive_spline(segment.spline, throttle_at_end=segment == path[-1], flip_hook=segment.backward)
-        self.paths = []
-        self.current_path = None
-        self.current_path_segment = None
+        self.path_index = None
+        self.segment_index = None
         self.invalidate()
 
+    def _precomputed_transit(self, index: int, paths: list[list[rosys.driving.PathSegment]],
+                             start_pose: Pose) -> Optional[list[rosys.driving.PathSegment]]:
+        """Return the precomputed transit to the path with the given index if the robot is close to its planned start."""
+        if index == 0 or index >= len(self.transits) or self.transits[index] is None:
+            return None
+        planned_start = paths[index - 1][-1].spline.pose(1)
+        if start_pose.distance(planned_start) > self.transit_tolerance or \
+                abs(angle(start_pose.yaw, planned_start.yaw)) > self.transit_yaw_tolerance:
+            self.log.info('robot deviates from the planned transit start, replanning')
+            return None
+        return self.transits[index]
+
     def _make_plan(self, lanes: list[LineString]) -> list[Spline]:
         self.log.info(f'converting {len(lanes)} lanes into splines and finding sequence')
-        if self.turning_radius * 2 > self.lane_distance:
-            minimum_distance = int(np.ceil(self.turning_radius * 2 / self.lane_distance))
-        else:
-            minimum_distance = 1
-        self.log.info(f'minimum distance: {minimum_distance}')
-        if minimum_distance > 1:
-            sequence = find_sequence(len(lanes), minimum_distance=minimum_distance)
-            if sequence == []:  # ToDO: handle missing sequence better
-                self.log.warning('!!!no valid sequence found!!!')
-                sequence = list(range(len(lanes)))
-        else:
-            sequence = list(range(len(lanes)))
+        sequence = find_lane_order(lane_offsets([lane.coords for lane in lanes]), minimum_distance=self.turning_radius * 2)
         self.log.info(f'sequence of splines: {sequence}')
         splines = []
         for i, index in enumerate(sequence):
@@ -0,0 +1,51 @@
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from rosys.geometry import Point
+
+MINIMUM_OBSERVATION_WEIGHT = 0.1
+"""weight of an observation without confidence (e.g. weeds from a detector which only reports categories)"""
+
+
+@dataclass(slots=True, kw_only=True)
+class Plant:
+    id: str = ...
+    type: str
+    position: Point
+    detection_time: float
+    confidence: float = 0.0
+    observations: int = 1
+    """number of detections which have been fused into this plant"""
+    weight: float = 0.0
+    """sum of the confidence weights of all fused detections"""
+    variance: float = 0.0
+    """weighted variance of the detected positions (in m²)"""
+    last_seen: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        """Generate a unique ID if not already loaded from persistence"""
+        if self.id == ...:
+            self.id = str(uuid.uuid4())
+        if self.weight == 0.0:
+            self.weight = max(self.confidence, MINIMUM_OBSERVATION_WEIGHT)
+        if self.last_seen is None:
+            self.last_seen = self.detection_time
+
+    def fuse(self, observation: 'Plant') -> None:
+        """Fuse another detection of the same plant into a confidence-weighted running mean and variance."""
+        weight = max(observation.confidence, MINIMUM_OBSERVATION_WEIGHT)
+        total_weight = self.weight + weight
+        dx_old = observation.position.x - self.position.x
+        dy_old = observation.position.y - self.position.y
+        position = Point(x=self.position.x + weight / total_weight * dx_old,
+                         y=self.position.y + weight / total_weight * dy_old)
+        dx_new = observation.position.x - position.x
+        dy_new = observation.position.y - position.y
+        sum_of_squares = self.variance * self.weight + weight * (dx_old * dx_new + dy_old * dy_new)
+        self.position = position
+        self.variance = sum_of_squares / total_weight
+        self.weight = total_weight
+        self.observations += 1
+        self.confidence = max(self.confidence, observation.confidence)
+        self.last_seen = max(self.last_seen or observation.detection_time, observation.detection_time)
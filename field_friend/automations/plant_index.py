@@ -0,0 +1,90 @@
+import math
+from typing import Callable, Iterator, Optional, Union
+
+from rosys.geometry import Point
+
+from .plant import Plant
+from .plant_store import PlantView
+
+Cell = tuple[int, int]
+IndexedPlant = Union[Plant, PlantView]
+
+
+class PlantIndex:
+    """Uniform grid hash over plant positions.
+
+    Plants are bucketed into square cells of size `cell_size`,
+    so radius queries only have to look at the few cells overlapping the query circle.
+    """
+
+    def __init__(self, cell_size: float = 0.1) -> None:
+        self.cell_size = cell_size
+        self._cells: dict[Cell, dict[str, IndexedPlant]] = {}
+        self._cell_of: dict[str, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def __contains__(self, plant_id: str) -> bool:
+        return plant_id in self._cell_of
+
+    def _cell(self, point: Point) -> Cell:
+        return (math.floor(point.x / self.cell_size), math.floor(point.y / self.cell_size))
+
+    def insert(self, plant: IndexedPlant) -> None:
+        if plant.id in self._cell_of:
+            self.update(plant)
+            return
+        cell = self._cell(plant.position)
+        self._cells.setdefault(cell, {})[plant.id] = plant
+        self._cell_of[plant.id] = cell
+
+    def remove(self, plant_id: str) -> Optional[IndexedPlant]:
+        cell = self._cell_of.pop(plant_id, None)
+        if cell is None:
+            return None
+        bucket = self._cells[cell]
+        plant = bucket.pop(plant_id)
+        if not bucket:
+            del self._cells[cell]
+        return plant
+
+    def update(self, plant: IndexedPlant) -> None:
+        """Move the plant into the cell matching its current position."""
+        old_cell = self._cell_of.get(plant.id)
+        new_cell = self._cell(plant.position)
+        if old_cell == new_cell:
+            return
+        if old_cell is not None:
+            self.remove(plant.id)
+        self._cells.setdefault(new_cell, {})[plant.id] = plant
+        self._cell_of[plant.id] = new_cell
+
+    def clear(self) -> None:
+        self._cells.clear()
+        self._cell_of.clear()
+
+    def get(self, plant_id: str) -> Optional[IndexedPlant]:
+        cell = self._cell_of.get(plant_id)
+        return None if cell is None else self._cells[cell][plant_id]
+
+    def query(self, point: Point, radius: float) -> Iterator[IndexedPlant]:
+        """Yield all plants closer than `radius` to the given point."""
+        min_i = math.floor((point.x - radius) / self.cell_size)
+        max_i = math.floor((point.x + radius) / self.cell_size)
+        min_j = math.floor((point.y - radius) / self.cell_size)
+        max_j = math.floor((point.y + radius) / self.cell_size)
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                bucket = self._cells.get((i, j))
+                if not bucket:
+                    continue
+                for plant in bucket.values():
+                    if plant.position.distance(point) < radius:
+                        yield plant
+
+    def find(self, point: Point, radius: float,
+             predicate: Callable[[IndexedPlant], bool] = lambda _: True) -> Optional[IndexedPlant]:
+        """Return the closest plant within `radius` which fulfills the predicate."""
+        candidates = [plant for plant in self.query(point, radius) if predicate(plant)]
+        return min(candidates, key=lambda plant: plant.position.distance(point), default=None)
@@ -1,9 +1,14 @@
 import asyncio
+import heapq
+import itertools
 import logging
-from typing import Optional
+from dataclasses import dataclass
+from typing import Literal, Optional
 
+import numpy as np
 import rosys
 
+from ..vision import SimulatedDetector
 from .plant import Plant
 from .plant_provider import PlantProvider
 
@@ -17,6 +22,20 @@ class DetectorError(Exception):
     pass
 
 
+@dataclass(slots=True)
+class DetectionStatistics:
+    processed: int = 0
+    """number of frames which have been detected"""
+    rejected: int = 0
+    """number of detect calls which returned without a result (e.g. because the detector was busy)"""
+    dropped: int = 0
+    """number of frames which have been skipped because a newer frame was available"""
+    lag_frames: int = 0
+    """number of newer frames which were already captured when the last detection finished"""
+    latency: float = 0.0
+    """time between capture and detection result of the last frame (in seconds)"""
+
+
 class PlantLocator:
 
     def __init__(self,
@@ -28,6 +47,8 @@ class PlantLocator:
         self.log = logging.getLogger('field_friend.plant_detection')
         self.camera_provider = camera_provider
         self.detector = detector
+        self.detectors: list[rosys.vision.Detector] = [detector]
+        """independent detector connections; the frames are distributed among them"""
         self.plant_provider = plant_provider
         self.odometer = odometer
         self.is_paused = True
@@ -35,6 +56,19 @@ class PlantLocator:
         self.crop_category_names: list[str] = CROP_CATEGORY_NAME
         self.minimum_weed_confidence: float = MINIMUM_WEED_CONFIDENCE
         self.minimum_crop_confidence: float = MINIMUM_CROP_CONFIDENCE
+        self.maximum_in_flight_per_camera: int = 2
+        self.scheduling: Literal['oldest', 'latest'] = 'oldest'
+        """'oldest' detects every frame in order, 'latest' always detects the newest frame and skips stale ones"""
+        self.statistics = DetectionStatistics()
+        self._last_scheduled: dict[str, float] = {}
+        self._in_flight: dict[str, dict[float, rosys.vision.Image]] = {}
+        self._busy: dict[str, int] = {}
+        """number of outstanding detect calls per detector"""
+        self._detected: list[tuple[float, int, rosys.vision.CalibratableCamera, rosys.vision.Image]] = []
+        self._detection_counter = itertools.count()
+        self._generation = 0
+        """incremented whenever pending results become stale; results of older generations are dropped"""
+        self.plant_provider.PLANTS_CLEARED.register(self._drop_pending_results)
         rosys.on_repeat(self._detect_plants, 0.001)  # as fast as possible, function will sleep if necessary
 
     async def _detect_plants(self) -> None:
@@ -42,55 +76,158 @@ class PlantLocator:
             await asyncio.sleep(0.01)
             return
         t = rosys.time()
-        camera = next((camera for camera in self.camera_provider.cameras.values() if camera.is_connected), None)
-        if not camera:
+        cameras = [camera for camera in self.camera_provider.cameras.values() if camera.is_connected]
+        if not cameras:
             rosys.notify('no camera connected')
             raise DetectorError()
-        if camera.calibration is None:
+        cameras = [camera for camera in cameras if camera.calibration is not None]
+        if not cameras:
             rosys.notify('camera has no calibration')
             raise DetectorError()
-        new_image = next((i for i in camera.images if not i.detections), None)
-        if new_image is None:
-            await asyncio.sleep(0.01)
-            return
-        await self.detector.detect(new_image)
+        scheduled = True
+        while scheduled:
+            scheduled = False
+            for camera in cameras:  # round robin, so no camera can use up the whole detector capacity
+                detector = self._idle_detector()
+                if detector is None:
+                    break
+                in_flight = self._in_flight.setdefault(camera.id, {})
+                if len(in_flight) >= self.maximum_in_flight_per_camera:
+                    continue
+                new_image = self._next_image(camera, in_flight)
+                if new_image is None:
+                    continue
+                in_flight[new_image.time] = new_image
+                self._last_scheduled[camera.id] = new_image.time
+                self._busy[detector.name] = self._busy.get(detector.name, 0) + 1
+                scheduled = True
+                rosys.background_tasks.create(self._detect_image(detector, camera, new_image),
+                                              name=f'detect_{camera.id}')
+        self._merge_results()
         if rosys.time() - t < 0.01:  # ensure maximum of 100 Hz
             await asyncio.sleep(0.01 - (rosys.time() - t))
+
+    def _idle_detector(self) -> Optional[rosys.vision.Detector]:
+        """Return a detector which can take another image.
+
+        The detector hardware is not reentrant: a second call while a detection is underway returns without result.
+        So only the simulated detector may process several images at once, up to its capacity.
+        """
+        for detector in self.detectors:
+            capacity = detector.capacity if isinstance(detector, SimulatedDetector) else 1
+            if self._busy.get(detector.name, 0) < capacity:
+                return detector
+        return None
+
+    def _next_image(self, camera: rosys.vision.CalibratableCamera,
+                    in_flight: dict[float, rosys.vision.Image]) -> Optional[rosys.vision.Image]:
+        candidates = [i for i in camera.images if not i.detections and i.time not in in_flight]
+        if self.scheduling == 'oldest':
+            return candidates[0] if candidates else None
+        last_scheduled = self._last_scheduled.get(camera.id, float('-inf'))
+        candidates = [i for i in candidates if i.time >= last_scheduled]  # a rejected frame may be retried
+        if not candidates:
+            return None
+        self.statistics.dropped += len(candidates) - 1
+        return candidates[-1]
+
+    async def _detect_image(self,
+                            detector: rosys.vision.Detector,
+                            camera: rosys.vision.CalibratableCamera,
+                            image: rosys.vision.Image) -> None:
+        generation = self._generation
+        try:
+            await detector.detect(image)
+        except Exception:
+            self.log.exception(f'could not detect plants in image of camera {camera.id}')
+            return
+        finally:
+            self._busy[detector.name] -= 1
+            self._in_flight[camera.id].pop(image.time, None)
+        if image.get_detections(detector.name) is None:
+            self.statistics.rejected += 1
+            return
+        if generation != self._generation:
+            return
+        self.statistics.processed += 1
+        self.statistics.lag_frames = sum(1 for i in camera.images if i.time > image.time)
+        self.statistics.latency = rosys.time() - image.time
+        heapq.heappush(self._detected, (image.time, next(self._detection_counter), camera, image))
+
+    def _merge_results(self) -> None:
+        """Hand detected images to the plant provider in capture-time order.
+
+        An image is only merged once no older image of any camera is still being detected.
+        """
+        in_flight_times = [time for images in self._in_flight.values() for time in images]
+        oldest_in_flight = min(in_flight_times, default=float('inf'))
+        while self._detected and self._detected[0][0] < oldest_in_flight:
+            _, _, camera, image = heapq.heappop(self._detected)
+            if camera.calibration is None:
+                continue
+            self._locate_plants(camera.calibration, image)
+
+    def _locate_plants(self, calibration: rosys.vision.Calibration, new_image: rosys.vision.Image) -> None:
         if not new_image.detections:
             return
             # raise DetetorError()
 
         # self.log.info(f'{[point.category_name for point in new_image.detections.points]} detections found')
+        detections: list[rosys.vision.PointDetection] = []
+        is_weed: list[bool] = []
         for d in new_image.detections.points:
             if d.category_name in self.weed_category_names and d.confidence >= self.minimum_weed_confidence:
-                # self.log.info('weed found')
-                image_point = rosys.geometry.Point(x=d.cx, y=d.cy)
-                floor_point = self.camera_provider.calibration.project_from_image(image_point)
-                if floor_point is None:
-                    self.log.error('could not generate floor point of detection, calibration error')
-                    continue
-                world_point = self.odometer.prediction.transform(floor_point.projection())
-                weed = Plant(position=world_point, type=d.category_name, detection_time=rosys.time())
-                self.plant_provider.add_weed(weed)
+                detections.append(d)
+                is_weed.append(True)
             elif d.category_name in self.crop_category_names and d.confidence >= self.minimum_crop_confidence:
-                # self.log.info('crop found')
-                image_point = rosys.geometry.Point(x=d.cx, y=d.cy)
-                floor_point = self.camera_provider.calibration.project_from_image(image_point)
-                if floor_point is None:
-                    self.log.error('could not generate floor point of detection, calibration error')
-                    continue
-                world_point = self.odometer.prediction.transform(floor_point.projection())
-                crop = Plant(position=world_point, type=d.category_name,
-                             detection_time=rosys.time(), confidence=d.confidence)
-                self.plant_provider.add_crop(crop)
+                detections.append(d)
+                is_weed.append(False)
             elif d.category_name not in self.crop_category_names and d.category_name not in self.weed_category_names:
                 self.log.info(f'{d.category_name} not in categories')
             # else:
             #     self.log.info(f'confidence of {d.category_name} to low: {d.confidence}')
+        if not detections:
+            return
+        capture_pose = self.odometer.get_pose(new_image.time)
+        world_points = self._project_to_world(calibration, detections, capture_pose)
+        with self.plant_provider.batch():
+            for d, weed_detected, world_point in zip(detections, is_weed, world_points):
+                if np.isnan(world_point).any():
+                    self.log.error('could not generate floor point of detection, calibration error')
+                    continue
+                position = rosys.geometry.Point(x=float(world_point[0]), y=float(world_point[1]))
+                if weed_detected:
+                    weed = Plant(position=position, type=d.category_name,
+                                 detection_time=rosys.time(), confidence=d.confidence)
+                    self.plant_provider.add_weed(weed)
+                else:
+                    crop = Plant(position=position, type=d.category_name,
+                                 detection_time=rosys.time(), confidence=d.confidence)
+                    self.plant_provider.add_crop(crop)
+
+    @staticmethod
+    def _project_to_world(calibration: rosys.vision.Calibration,
+                          detections: list[rosys.vision.PointDetection],
+                          pose: rosys.geometry.Pose) -> np.ndarray:
+        """Project all image detections onto the floor and into world coordinates at once.
+
+        Returns an Nx2 array; rows of detections which could not be projected are NaN.
+        """
+        image_points = np.array([[d.cx, d.cy] for d in detections], dtype=float)
+        floor_points = np.asarray(calibration.project_from_image(image_points), dtype=float).reshape(-1, 3)
+        cos, sin = np.cos(pose.yaw), np.sin(pose.yaw)
+        rotation = np.array([[cos, -sin], [sin, cos]])
+        return floor_points[:, :2] @ rotation.T + np.array([pose.x, pose.y])
+
+    def _drop_pending_results(self) -> None:
+        """Drop detected but not yet merged results and those of detections which are still underway."""
+        self._generation += 1
+        self._detected.clear()
 
     def pause(self) -> None:
         self.log.info('pausing plant detection')
         self.is_paused = True
+        self._drop_pending_results()
 
     def resume(self) -> None:
         self.log.info('resuming plant detection')
@@ -1,34 +1,58 @@
 import logging
-import uuid
-from dataclasses import dataclass
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Union
 
+import numpy as np
 import rosys
 from rosys.geometry import Point
 
+from .plant import Plant
+from .plant_index import PlantIndex
+from .plant_store import PlantStore, PlantView
 
-@dataclass(slots=True, kw_only=True)
-class Plant:
-    id: str = ...
-    type: str
-    position: Point
-    detection_time: float
-    confidence: float = 0.0
+WEED_MATCH_DISTANCE = 0.02
+CROP_MATCH_DISTANCE = 0.03
 
-    def __post_init__(self) -> None:
-        """Generate a unique ID if not already loaded from persistence"""
-        if self.id == ...:
-            self.id = str(uuid.uuid4())
+
+@dataclass(slots=True)
+class PlantsChange:
+    added: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+    moved: set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved)
+
+    def add(self, plant_id: str) -> None:
+        self.removed.discard(plant_id)
+        self.added.add(plant_id)
+
+    def remove(self, plant_id: str) -> None:
+        self.moved.discard(plant_id)
+        if plant_id in self.added:
+            self.added.discard(plant_id)
+        else:
+            self.removed.add(plant_id)
+
+    def move(self, plant_id: str) -> None:
+        if plant_id not in self.added:
+            self.moved.add(plant_id)
 
 
 class PlantProvider:
 
     def __init__(self) -> None:
         self.log = logging.getLogger('field_friend.plant_provider')
-        self.weeds: list[Plant] = []
-        self.crops: list[Plant] = []
+        self.weeds = PlantStore()
+        self.crops = PlantStore()
+        self.weed_index = PlantIndex()
+        self.crop_index = PlantIndex()
+        self._change = PlantsChange()
+        self._batch_depth = 0
 
         self.PLANTS_CHANGED = rosys.event.Event()
-        """The collection of plants has changed."""
+        """The collection of plants has changed (argument: PlantsChange with added, removed and moved plant IDs)."""
 
         self.ADDED_NEW_WEED = rosys.event.Event()
         """A new weed has been added."""
@@ -36,49 +60,107 @@ class PlantProvider:
         self.ADDED_NEW_BEET = rosys.event.Event()
         """A new beet has been added."""
 
+        self.PLANTS_CLEARED = rosys.event.Event()
+        """All plants have been removed."""
+
         rosys.on_repeat(self.prune, 10.0)
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Collect all changes within the context and emit a single PLANTS_CHANGED event at the end."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            self._emit_changes()
+
+    def _emit_changes(self) -> None:
+        if self._batch_depth > 0 or not self._change:
+            return
+        change = self._change
+        self._change = PlantsChange()
+        self.PLANTS_CHANGED.emit(change)
+
+    def get_plant(self, plant_id: str) -> Optional[PlantView]:
+        return self.weeds.get(plant_id) or self.crops.get(plant_id)
+
     def prune(self, max_age: float = 10 * 60.0) -> None:
-        self.weeds[:] = [weed for weed in self.weeds if weed.detection_time > rosys.time() - max_age]
-        self.crops[:] = [crop for crop in self.crops if crop.detection_time > rosys.time() - max_age]
-        self.PLANTS_CHANGED.emit()
+        min_time = rosys.time() - max_age
+        for plants, index in [(self.weeds, self.weed_index), (self.crops, self.crop_index)]:
+            outdated = [plants.ids[i] for i in np.flatnonzero(plants.last_seen <= min_time)]
+            for plant_id in outdated:
+                plants.remove(plant_id)
+                index.remove(plant_id)
+                self._change.remove(plant_id)
+        self._emit_changes()
 
     def add_weed(self, weed: Plant) -> None:
-        for w in self.weeds:
-            if w.position.distance(weed.position) < 0.02 and w.type == weed.type and w.confidence < weed.confidence:
-                w.position = weed.position
-                self.PLANTS_CHANGED.emit()
-                return
-        self.weeds.append(weed)
-        self.PLANTS_CHANGED.emit()
+        w = self.weed_index.find(weed.position, WEED_MATCH_DISTANCE, lambda w: w.type == weed.type)
+        if w is not None:
+            w.fuse(weed)
+            self.weed_index.update(w)
+            self._change.move(w.id)
+            self._emit_changes()
+            return
+        self.weed_index.insert(self.weeds.append(weed))
+        self._change.add(weed.id)
+        self._emit_changes()
         self.ADDED_NEW_WEED.emit()
 
+    def move_weed(self, weed: PlantView, position: Point) -> None:
+        weed.position = position
+        self.weed_index.update(weed)
+        self._change.move(weed.id)
+        self._emit_changes()
+
     def remove_weed(self, weed_id: str) -> None:
-        self.weeds[:] = [weed for weed in self.weeds if weed.id != weed_id]
-        self.PLANTS_CHANGED.emit()
+        if self.weed_index.remove(weed_id) is not None:
+            self.weeds.remove(weed_id)
+            self._change.remove(weed_id)
+        self._emit_changes()
 
     def clear_weeds(self) -> None:
+        for weed_id in self.weeds.ids:
+            self._change.remove(weed_id)
         self.weeds.clear()
-        self.PLANTS_CHANGED.emit()
+        self.weed_index.clear()
+        self._emit_changes()
+
+    def get_weeds_near(self, point: Point, radius: float) -> list[PlantView]:
+        return list(self.weed_index.query(point, radius))
 
     def add_crop(self, crop: Plant) -> None:
-        for c in self.crops:
-            if c.position.distance(crop.position) < 0.03 and c.type == crop.type and c.confidence < crop.confidence:
-                c.position = crop.position
-                self.PLANTS_CHANGED.emit()
-                return
-        self.crops.append(crop)
-        self.PLANTS_CHANGED.emit()
+        c = self.crop_index.find(crop.position, CROP_MATCH_DISTANCE, lambda c: c.type == crop.type)
+        if c is not None:
+            c.fuse(crop)
+            self.crop_index.update(c)
+            self._change.move(c.id)
+            self._emit_changes()
+            return
+        self.crop_index.insert(self.crops.append(crop))
+        self._change.add(crop.id)
+        self._emit_changes()
         self.ADDED_NEW_BEET.emit()
 
-    def remove_crop(self, crop: Plant) -> None:
-        self.crops[:] = [c for c in self.crops if c.id != crop.id]
-        self.PLANTS_CHANGED.emit()
+    def remove_crop(self, crop: Union[Plant, PlantView]) -> None:
+        if self.crop_index.remove(crop.id) is not None:
+            self.crops.remove(crop.id)
+            self._change.remove(crop.id)
+        self._emit_changes()
 
     def clear_crops(self) -> None:
+        for crop_id in self.crops.ids:
+            self._change.remove(crop_id)
         self.crops.clear()
-        self.PLANTS_CHANGED.emit()
+        self.crop_index.clear()
+        self._emit_changes()
+
+    def get_crops_near(self, point: Point, radius: float) -> list[PlantView]:
+        return list(self.crop_index.query(point, radius))
 
     def clear(self) -> None:
-        self.clear_weeds()
-        self.clear_crops()
+        with self.batch():
+            self.clear_weeds()
+            self.clear_crops()
+        self.PLANTS_CLEARED.emit()
@@ -0,0 +1,41 @@
+from typing import Callable, Literal, Optional, Sequence, Union
+
+import numpy as np
+from rosys.geometry import Point, Pose
+
+from .plant import Plant
+from .plant_store import PlantStore, PlantView
+
+PointMask = Callable[[np.ndarray], np.ndarray]
+"""takes an Nx2 array of local coordinates and returns a boolean mask of length N"""
+
+
+def relative_points(pose: Pose, points: np.ndarray) -> np.ndarray:
+    """Transform an Nx2 array of world coordinates into the local frame of the given pose."""
+    cos, sin = np.cos(pose.yaw), np.sin(pose.yaw)
+    rotation = np.array([[cos, sin], [-sin, cos]])
+    return (points - np.array([pose.x, pose.y])) @ rotation.T
+
+
+def positions(plants: Union[PlantStore, Sequence[Plant]]) -> np.ndarray:
+    """Return the plant positions as an Nx2 array (without copying for a PlantStore)."""
+    if isinstance(plants, PlantStore):
+        return plants.positions
+    return np.array([(plant.position.x, plant.position.y) for plant in plants], dtype=float).reshape(-1, 2)
+
+
+def sort_plants(plants: Union[PlantStore, Sequence[Plant]],
+                pose: Pose,
+                order: Literal['x', 'y'],
+                mask: Optional[PointMask] = None,
+                reverse: bool = False,
+                ) -> list[tuple[Point, Union[Plant, PlantView]]]:
+    """Transform all plants into the robot frame at once, filter them by mask and sort by local x or y coordinate."""
+    local_points = relative_points(pose, positions(plants))
+    indices = np.arange(len(local_points))
+    if mask is not None and len(local_points):
+        indices = indices[mask(local_points)]
+    indices = indices[np.argsort(local_points[indices, 0 if order == 'x' else 1], kind='stable')]
+    if reverse:
+        indices = indices[::-1]
+    return [(Point(x=float(local_points[i, 0]), y=float(local_points[i, 1])), plants[i]) for i in indices]
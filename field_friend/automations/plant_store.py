@@ -0,0 +1,224 @@
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from rosys.geometry import Point
+
+from .plant import Plant
+
+
+class PlantView:
+    """Object view on a single plant of a PlantStore which can be used like a Plant."""
+
+    __slots__ = ('_store', 'id')
+
+    def __init__(self, store: 'PlantStore', id: str) -> None:
+        self._store = store
+        self.id = id
+
+    @property
+    def _row(self) -> int:
+        return self._store._row_of[self.id]
+
+    @property
+    def type(self) -> str:
+        return self._store.types[self._store._type[self._row]]
+
+    @type.setter
+    def type(self, value: str) -> None:
+        self._store._type[self._row] = self._store.type_code(value)
+
+    @property
+    def position(self) -> Point:
+        x, y = self._store._position[self._row]
+        return Point(x=float(x), y=float(y))
+
+    @position.setter
+    def position(self, value: Point) -> None:
+        self._store._position[self._row] = (value.x, value.y)
+
+    @property
+    def detection_time(self) -> float:
+        return float(self._store._detection_time[self._row])
+
+    @detection_time.setter
+    def detection_time(self, value: float) -> None:
+        self._store._detection_time[self._row] = value
+
+    @property
+    def confidence(self) -> float:
+        return float(self._store._confidence[self._row])
+
+    @confidence.setter
+    def confidence(self, value: float) -> None:
+        self._store._confidence[self._row] = value
+
+    @property
+    def observations(self) -> int:
+        return int(self._store._observations[self._row])
+
+    @observations.setter
+    def observations(self, value: int) -> None:
+        self._store._observations[self._row] = value
+
+    @property
+    def weight(self) -> float:
+        return float(self._store._weight[self._row])
+
+    @weight.setter
+    def weight(self, value: float) -> None:
+        self._store._weight[self._row] = value
+
+    @property
+    def variance(self) -> float:
+        return float(self._store._variance[self._row])
+
+    @variance.setter
+    def variance(self, value: float) -> None:
+        self._store._variance[self._row] = value
+
+    @property
+    def last_seen(self) -> float:
+        return float(self._store._last_seen[self._row])
+
+    @last_seen.setter
+    def last_seen(self, value: float) -> None:
+        self._store._last_seen[self._row] = value
+
+    def fuse(self, observation: Plant) -> None:
+        Plant.fuse(self, observation)  # type: ignore[arg-type]
+
+    def to_plant(self) -> Plant:
+        return Plant(id=self.id, type=self.type, position=self.position, detection_time=self.detection_time,
+                     confidence=self.confidence, observations=self.observations, weight=self.weight,
+                     variance=self.variance, last_seen=self.last_seen)
+
+    def __repr__(self) -> str:
+        return f'PlantView(id={self.id!r}, type={self.type!r}, position={self.position})'
+
+
+class PlantStore:
+    """Structure-of-arrays storage for large plant maps.
+
+    Positions, times, confidences and type codes are kept in contiguous NumPy arrays,
+    so queries over thousands of plants can be computed without creating Python objects per plant.
+    Iterating or indexing the store yields PlantView objects which behave like Plant.
+    """
+
+    ARRAYS = ['_position', '_detection_time', '_confidence', '_weight', '_variance', '_last_seen',
+              '_observations', '_type']
+
+    def __init__(self, plants: Iterable[Plant] = (), *, capacity: int = 64) -> None:
+        self.types: list[str] = []
+        self._type_codes: dict[str, int] = {}
+        self._ids: list[str] = []
+        self._row_of: dict[str, int] = {}
+        self._position = np.zeros((capacity, 2))
+        self._detection_time = np.zeros(capacity)
+        self._confidence = np.zeros(capacity)
+        self._weight = np.zeros(capacity)
+        self._variance = np.zeros(capacity)
+        self._last_seen = np.zeros(capacity)
+        self._observations = np.zeros(capacity, dtype=np.int32)
+        self._type = np.zeros(capacity, dtype=np.int16)
+        self.extend(plants)
+
+    def _grow(self) -> None:
+        capacity = max(2 * len(self._position), 64)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, plant_id: str) -> bool:
+        return plant_id in self._row_of
+
+    def __iter__(self) -> Iterator[PlantView]:
+        return (PlantView(self, id) for id in list(self._ids))
+
+    def __getitem__(self, index: int) -> PlantView:
+        return PlantView(self, self._ids[index])
+
+    def get(self, plant_id: str) -> Optional[PlantView]:
+        return PlantView(self, plant_id) if plant_id in self._row_of else None
+
+    def type_code(self, type: str) -> int:
+        if type not in self._type_codes:
+            self._type_codes[type] = len(self.types)
+            self.types.append(type)
+        return self._type_codes[type]
+
+    def append(self, plant: Plant) -> PlantView:
+        if plant.id in self._row_of:
+            raise ValueError(f'plant {plant.id} is already stored')
+        row = len(self._ids)
+        if row == len(self._position):
+            self._grow()
+        self._ids.append(plant.id)
+        self._row_of[plant.id] = row
+        self._position[row] = (plant.position.x, plant.position.y)
+        self._detection_time[row] = plant.detection_time
+        self._confidence[row] = plant.confidence
+        self._weight[row] = plant.weight
+        self._variance[row] = plant.variance
+        self._last_seen[row] = plant.last_seen
+        self._observations[row] = plant.observations
+        self._type[row] = self.type_code(plant.type)
+        return PlantView(self, plant.id)
+
+    def extend(self, plants: Iterable[Plant]) -> None:
+        for plant in plants:
+            self.append(plant)
+
+    def remove(self, plant_id: str) -> None:
+        """Remove a plant by moving the last plant into its row (the order of plants is not preserved)."""
+        row = self._row_of.pop(plant_id)
+        last = len(self._ids) - 1
+        if row != last:
+            last_id = self._ids[last]
+            for name in self.ARRAYS:
+                array = getattr(self, name)
+                array[row] = array[last]
+            self._ids[row] = last_id
+            self._row_of[last_id] = row
+        self._ids.pop()
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._row_of.clear()
+
+    @property
+    def ids(self) -> list[str]:
+        return self._ids
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Nx2 array of all plant positions (a view, not a copy)."""
+        return self._position[:len(self._ids)]
+
+    @property
+    def detection_times(self) -> np.ndarray:
+        return self._detection_time[:len(self._ids)]
+
+    @property
+    def confidences(self) -> np.ndarray:
+        return self._confidence[:len(self._ids)]
+
+    @property
+    def last_seen(self) -> np.ndarray:
+        return self._last_seen[:len(self._ids)]
+
+    @property
+    def type_codes(self) -> np.ndarray:
+        return self._type[:len(self._ids)]
+
+    def type_mask(self, types: Iterable[str]) -> np.ndarray:
+        """Boolean mask of all plants with one of the given types."""
+        codes = [self._type_codes[type] for type in types if type in self._type_codes]
+        return np.isin(self.type_codes, codes)
+
+    def to_plants(self) -> list[Plant]:
+        return [view.to_plant() for view in self]
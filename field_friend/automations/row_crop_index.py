@@ -0,0 +1,103 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+import numpy as np
+from rosys.geometry import Point
+
+from .plant import Plant
+
+
+class RowCropIndex:
+    """Crops of a row sorted by their station, i.e. the arc length of their projection onto the row polyline.
+
+    The given crop list is sorted in place and kept sorted by `insert` and `remove`,
+    so range queries along the row only need a binary search.
+    """
+
+    def __init__(self, points: list[Point], crops: list[Plant]) -> None:
+        self.points = points
+        self.crops = crops
+        vertices = np.array([(point.x, point.y) for point in points], dtype=float).reshape(-1, 2)
+        deltas = np.diff(vertices, axis=0)
+        self._lengths = np.linalg.norm(deltas, axis=1)
+        self._starts = vertices[:-1]
+        self._directions = deltas / np.maximum(self._lengths, 1e-9)[:, None]
+        self.vertex_stations = np.concatenate([[0.0], np.cumsum(self._lengths)])
+        """station of each row point"""
+        stations = self.stations_of(np.array([(crop.position.x, crop.position.y) for crop in crops]))
+        order = np.argsort(stations, kind='stable')
+        self.stations: list[float] = stations[order].tolist()
+        crops[:] = [crops[i] for i in order]
+
+    @property
+    def is_valid(self) -> bool:
+        """Whether the crop list has not been modified without this index."""
+        return len(self.stations) == len(self.crops)
+
+    def project(self, points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Project an Nx2 array of points onto the closest segment of the row.
+
+        :return: stations and lateral offsets (positive to the left of the row direction)
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if not len(self._starts):
+            return np.zeros(len(points)), np.zeros(len(points))
+        offsets = points[:, None, :] - self._starts[None, :, :]
+        t = np.clip(np.einsum('nsk,sk->ns', offsets, self._directions), 0, self._lengths)
+        distances = np.linalg.norm(offsets - t[:, :, None] * self._directions[None, :, :], axis=2)
+        segments = np.argmin(distances, axis=1)
+        rows = np.arange(len(points))
+        directions = self._directions[segments]
+        lateral = directions[:, 0] * offsets[rows, segments, 1] - directions[:, 1] * offsets[rows, segments, 0]
+        return self.vertex_stations[segments] + t[rows, segments], lateral
+
+    def stations_of(self, points: np.ndarray) -> np.ndarray:
+        """Project an Nx2 array of points onto the closest segment of the row and return their stations."""
+        return self.project(points)[0]
+
+    def point_at(self, station: float, offset: float = 0.0) -> Point:
+        """Return the point at the given station and lateral offset (positive to the left of the row direction)."""
+        if not len(self._starts):
+            return Point(x=self.points[0].x, y=self.points[0].y) if self.points else Point(x=0, y=0)
+        segment = int(np.clip(np.searchsorted(self.vertex_stations, station, side='right') - 1, 0, len(self._starts) - 1))
+        direction = self._directions[segment]
+        x, y = self._starts[segment] + (station - self.vertex_stations[segment]) * direction
+        return Point(x=float(x - offset * direction[1]), y=float(y + offset * direction[0]))
+
+    def station(self, point: Point) -> float:
+        return float(self.stations_of(np.array([[point.x, point.y]]))[0])
+
+    def between(self, start: float, end: float) -> list[Plant]:
+        """Return all crops with a station between start and end (inclusive) in O(log n + k)."""
+        return self.crops[bisect_left(self.stations, start):bisect_right(self.stations, end)]
+
+    def nearest(self, point: Point, tolerance: float) -> Optional[Plant]:
+        """Return the crop whose station is closest to the station of the given point, if within the tolerance."""
+        station = self.station(point)
+        first = bisect_left(self.stations, station - tolerance)
+        last = bisect_right(self.stations, station + tolerance)
+        if first == last:
+            return None
+        return self.crops[min(range(first, last), key=lambda i: abs(self.stations[i] - station))]
+
+    def insert(self, crop: Plant) -> None:
+        station = self.station(crop.position)
+        i = bisect_right(self.stations, station)
+        self.stations.insert(i, station)
+        self.crops.insert(i, crop)
+
+    def remove(self, crop: Plant) -> None:
+        station = self.station(crop.position)
+        for i in range(bisect_left(self.stations, station - 1e-9), len(self.crops)):
+            if self.crops[i] is crop:
+                del self.stations[i]
+                del self.crops[i]
+                return
+        raise ValueError(f'{crop} is not in the row')
+
+    def path_points(self) -> list[Point]:
+        """Return the row points and crop positions merged in the order of their stations."""
+        vertices = zip(self.vertex_stations.tolist(), self.points)
+        crops = zip(self.stations, (crop.position for crop in self.crops))
+        return [point for _, point in heapq.merge(vertices, crops, key=lambda item: item[0])]
@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from typing import Callable, Literal, Sequence, Union
+
+import numpy as np
+
+from .plant import Plant
+from .plant_store import PlantView
+from .row_crop_index import RowCropIndex
+
+Tool = Literal['drill', 'chop']
+
+
+@dataclass(slots=True, kw_only=True)
+class WeedingAction:
+    station: float
+    """station along the row at which the tool has to be positioned"""
+    y: float
+    """lateral tool position relative to the row (positive to the left of the row direction)"""
+    tool: Tool
+    depth: float = 0.0
+    plant_ids: list[str] = field(default_factory=list)
+    """weeds which are treated by this action"""
+
+
+class RowActionPlanner:
+    """Plans the weeding actions along a row from its crop map and the known weeds.
+
+    Weeds are covered with as few stops as possible:
+    starting at the first untreated weed, a chop covers all weeds within the chop reach if no crop is in danger,
+    otherwise the drill punches all weeds within its reach at a common stop.
+    Weeds which cannot be punched at that stop without endangering a crop get a stop of their own.
+    The punches of consecutive stops alternate their direction along the y axis to keep the axis travel short.
+    """
+
+    def __init__(self,
+                 crop_index: RowCropIndex,
+                 reach_areas: dict[str, np.ndarray],
+                 *,
+                 depth: Callable[[str], float],
+                 margin: float) -> None:
+        """
+        :param crop_index: crop map of the row
+        :param reach_areas: local reach area (x_min, x_max, y_min, y_max) of each tool
+        :param depth: drill depth for a weed type
+        :param margin: distance kept between the reach of a tool and every crop
+        """
+        self.crop_index = crop_index
+        self.depth = depth
+        self.margin = margin
+        self.tool_x: dict[str, float] = {}
+        """local x coordinate of the tool center"""
+        self.radius: dict[str, float] = {}
+        self.y_limit: dict[str, float] = {}
+        """maximum lateral offset reachable in both driving directions"""
+        for tool in ('drill', 'chop'):
+            if tool in reach_areas and np.all(np.isfinite(reach_areas[tool])):
+                x_min, x_max, y_min, y_max = reach_areas[tool]
+                self.tool_x[tool] = (x_min + x_max) / 2
+                self.radius[tool] = (x_max - x_min) / 2
+                self.y_limit[tool] = min(-y_min, y_max)
+
+    def plan(self, weeds: Sequence[Union[Plant, PlantView]], *, reverse: bool = False) -> list[WeedingAction]:
+        """Return the actions for the given weeds in driving order."""
+        if 'drill' not in self.radius or not weeds:
+            return []
+        stations, offsets = self.crop_index.project(np.array([(weed.position.x, weed.position.y) for weed in weeds]))
+        reachable = np.abs(offsets) <= max(self.y_limit.values())
+        indices = np.flatnonzero(reachable)[np.argsort(stations[reachable], kind='stable')]
+        stops: list[list[WeedingAction]] = []
+        deferred: list[WeedingAction] = []
+        i = 0
+        while i < len(indices):
+            first = stations[indices[i]]
+            if 'chop' in self.radius:
+                window = first + 2 * self.radius['chop']
+                end = int(np.searchsorted(stations[indices], window, side='right'))
+                chop_station = first + self.radius['chop']
+                covered = [weeds[j].id for j in indices[i:end] if abs(offsets[j]) <= self.y_limit['chop']]
+                if covered and self._can_chop(chop_station):
+                    stops.append([WeedingAction(station=chop_station, y=0.0, tool='chop', plant_ids=covered)])
+                    i = max(end, i + 1)
+                    continue
+            radius = self.radius['drill']
+            end = int(np.searchsorted(stations[indices], first + 2 * radius, side='right'))
+            stop_station = first + radius
+            punches: list[WeedingAction] = []
+            for j in indices[i:end]:
+                if abs(offsets[j]) > self.y_limit['drill']:
+                    continue
+                y = self._safe_y(stations[j], offsets[j])
+                action = WeedingAction(station=stop_station, y=y, tool='drill', depth=self.depth(weeds[j].type),
+                                       plant_ids=[weeds[j].id])
+                if not self._endangers_crop(stop_station, y):
+                    punches.append(action)
+                elif not self._endangers_crop(stations[j], y):
+                    action.station = float(stations[j])
+                    deferred.append(action)
+            if punches:
+                stops.append(punches)
+            i = end
+        stops.extend([action] for action in deferred)
+        stops.sort(key=lambda stop: stop[0].station, reverse=reverse)
+        actions: list[WeedingAction] = []
+        for k, stop in enumerate(stops):
+            actions.extend(self._merge_punches(sorted(stop, key=lambda action: action.y, reverse=k % 2 == 1)))
+        return actions
+
+    def _crops_near(self, station: float, distance: float) -> tuple[np.ndarray, np.ndarray]:
+        crops = self.crop_index.between(station - distance, station + distance)
+        return self.crop_index.project(np.array([(crop.position.x, crop.position.y) for crop in crops]))
+
+    def _can_chop(self, station: float) -> bool:
+        stations, offsets = self._crops_near(station, self.radius['chop'] + self.margin)
+        return not np.any(np.abs(offsets) <= self.y_limit['chop'] + self.margin)
+
+    def _clearance(self) -> float:
+        return self.radius['drill'] + self.margin
+
+    def _endangers_crop(self, station: float, y: float) -> bool:
+        stations, offsets = self._crops_near(station, self._clearance())
+        return bool(np.any(np.hypot(stations - station, offsets - y) < self._clearance()))
+
+    def _safe_y(self, station: float, y: float) -> float:
+        """Move the punch away from crops which are too close to the weed (like `WeedingNew._keep_beets_safe`)."""
+        stations, offsets = self._crops_near(station, self._clearance())
+        for crop_station, crop_y in zip(stations, offsets):
+            if np.hypot(crop_station - station, crop_y - y) < self._clearance():
+                y = crop_y - self._clearance() if crop_y > y else crop_y + self._clearance()
+        return float(y)
+
+    def _merge_punches(self, punches: list[WeedingAction]) -> list[WeedingAction]:
+        """Combine punches of the same stop which are closer than the drill radius."""
+        merged: list[WeedingAction] = []
+        for punch in punches:
+            previous = merged[-1] if merged else None
+            if previous is not None and previous.tool == 'drill' == punch.tool and \
+                    previous.station == punch.station and abs(previous.y - punch.y) < self.radius['drill']:
+                previous.plant_ids.extend(punch.plant_ids)
+                previous.depth = max(previous.depth, punch.depth)
+                continue
+            merged.append(punch)
+        return merged
@@ -1,3 +1,8 @@
+from typing import Sequence, Union
+
+import numpy as np
+
+
 def find_sequence(number_of_nodes: int, *, minimum_distance: int) -> list[int]:
     """Find a sequence of nodes that fulfills the following constraints.
 
@@ -28,3 +33,113 @@ def find_sequence(number_of_nodes: int, *, minimum_distance: int) -> list[int]:
     if nodes:
         sequence.append(nodes.pop())
     return sequence
+
+
+def find_lane_order(offsets: Union[Sequence[float], np.ndarray], *,
+                    minimum_distance: float,
+                    start: int = 0) -> list[int]:
+    """Find an order of parallel lanes which minimizes the lateral transit distance between consecutive lanes.
+
+    Consecutive lanes are connected by a U-turn at alternating ends,
+    which is only possible without maneuvering
+    if their distance is at least `minimum_distance` (twice the turning radius).
+    Narrower turns are penalized with the length of such a maneuver, so that an order always exists.
+    The order is constructed greedily and improved with 2-opt and or-opt moves
+    until no move reduces the distance or `max_iterations` sweeps have been made.
+
+    :param offsets: lateral position of each lane
+    :param minimum_distance: minimum distance between two consecutive lanes
+    :param start: index of the first lane
+    :return: indices of all lanes in driving order
+    """
+    number_of_lanes = len(offsets)
+    if number_of_lanes < 2:
+        return list(range(number_of_lanes))
+    positions = np.asarray(offsets, dtype=float)
+    gaps = np.abs(positions[:, None] - positions[None, :])
+    penalty = 2 * minimum_distance + np.ptp(positions)
+    costs = gaps + np.where(gaps < minimum_distance - 1e-9, penalty, 0.0)
+
+    candidates = [_greedy_order(costs, start)]
+    steps = np.diff(positions)
+    if minimum_distance > 0 and start == 0 and (np.all(steps > 0) or np.all(steps < 0)):
+        # find_sequence expects equally spaced lanes with an integer minimum distance in lanes
+        spacing = float(np.median(np.abs(steps)))
+        sequence = find_sequence(number_of_lanes, minimum_distance=int(np.ceil(minimum_distance / spacing - 1e-9)))
+        if len(sequence) == number_of_lanes:
+            candidates.append(sequence)
+    orders = [_improve_order(costs, order) for order in candidates]
+    return min(orders, key=lambda order: _order_cost(costs, order))
+
+
+def _order_cost(costs: np.ndarray, order: list[int]) -> float:
+    return float(costs[order[:-1], order[1:]].sum())
+
+
+def _greedy_order(costs: np.ndarray, start: int) -> list[int]:
+    """Always continue with the cheapest lane that has not been visited yet."""
+    visited = np.zeros(len(costs), dtype=bool)
+    order = [start]
+    visited[start] = True
+    for _ in range(len(costs) - 1):
+        next_costs = np.where(visited, np.inf, costs[order[-1]])
+        order.append(int(np.argmin(next_costs)))
+        visited[order[-1]] = True
+    return order
+
+
+def _improve_order(costs: np.ndarray, order: list[int], *,
+                   max_segment_length: int = 3, max_iterations: int = 20) -> list[int]:
+    """Apply improving 2-opt and or-opt moves to an open path with a fixed first node.
+
+    Every sweep tries all moves once; sweeps are repeated until none improves the path or the limit is reached.
+    """
+    order = list(order)
+    n = len(order)
+    improved = True
+    for _ in range(max_iterations):
+        if not improved:
+            break
+        improved = False
+        # 2-opt: reverse order[i:j + 1]
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                before = costs[order[i - 1], order[i]]
+                after = costs[order[i - 1], order[j]]
+                if j + 1 < n:
+                    before += costs[order[j], order[j + 1]]
+                    after += costs[order[i], order[j + 1]]
+                if after < before - 1e-9:
+                    order[i:j + 1] = order[i:j + 1][::-1]
+                    improved = True
+        # or-opt: move order[i:i + length] (possibly reversed) behind another node
+        for length in range(1, max_segment_length + 1):
+            i = 1
+            while i + length <= n:
+                segment = order[i:i + length]
+                rest = order[:i] + order[i + length:]
+                removed = costs[order[i - 1], segment[0]]
+                if i + length < n:
+                    removed += costs[segment[-1], order[i + length]] - costs[order[i - 1], order[i + length]]
+                best_gain, best_move = 1e-9, None
+                for candidate in (segment, segment[::-1]):
+                    # insert behind rest[k] for all k at once
+                    inserted = costs[rest, candidate[0]]
+                    inserted[:-1] += costs[candidate[-1], rest[1:]] - costs[rest[:-1], rest[1:]]
+                    k = int(np.argmax(removed - inserted))
+                    if removed - inserted[k] > best_gain:
+                        best_gain, best_move = removed - inserted[k], (k, candidate)
+                if best_move is not None:
+                    k, candidate = best_move
+                    order = rest[:k + 1] + candidate + rest[k + 1:]
+                    improved = True
+                i += 1
+    return order
+
+
+def lane_offsets(lanes: Sequence[Sequence[tuple[float, float]]]) -> np.ndarray:
+    """Return the lateral position of each lane (given by its points) perpendicular to the first lane."""
+    first = np.asarray(lanes[0], dtype=float)
+    direction = first[-1] - first[0]
+    normal = np.array([-direction[1], direction[0]]) / np.linalg.norm(direction)
+    return np.array([np.asarray(lane, dtype=float)[0] @ normal for lane in lanes])
@@ -1,14 +1,15 @@
 import logging
 import random
 from functools import partial
-from typing import TYPE_CHECKING, Callable, Literal, Optional
+from typing import TYPE_CHECKING, Literal, Optional, Union
 
 import numpy as np
 import rosys
 from rosys.geometry import Line, Point, Point3d, Pose, Spline
 from rosys.helpers import angle, eliminate_pi, ramp
 
-from . import DetectorError, Field, Plant, Row, find_sequence
+from . import DetectorError, Field, Plant, PlantStore, PlantView, Row, find_sequence, plant_query
+from .plant_query import PointMask
 
 if TYPE_CHECKING:
     from system import System
@@ -105,11 +106,11 @@ class Weeding:
             return None
 
         robot_position = self.system.odometer.prediction.point
-        rows = [row for row in self.field.rows if len(row.points) > 1]
+        rows = [row for row in self.field.rows if len(row.points(self.field.reference)) > 1]
         self.log.info(f'Rows: {rows}')
         if not self.row:
-            row_distances = [Line.from_points(row.points[0], row.points[-1]).distance(robot_position)
-                             for row in rows]
+            row_points = [row.points(self.field.reference) for row in rows]
+            row_distances = [Line.from_points(points[0], points[-1]).distance(robot_position) for points in row_points]
             closest_index = np.argmin(row_distances)
             self.log.info(f'Closest row: {closest_index}')
             closest_row = self.field.rows[closest_index]
@@ -123,7 +124,8 @@ class Weeding:
             self.log.info('poppping from sequence')
             sequence.pop(0)
 
-        closest_row_yaw = closest_row.points[0].direction(closest_row.points[-1])
+        closest_row_points = closest_row.points(self.field.reference)
+        closest_row_yaw = closest_row_points[0].direction(closest_row_points[-1])
         flip_first = abs(angle(closest_row_yaw, self.system.odometer.prediction.yaw)) > np.pi / 2
 
         plan = []
@@ -145,23 +147,18 @@ class Weeding:
             await self.system.plant_locator.detect_plants(self.system.camera_selector.cameras['bottom_cam'])
         self.keep_beets_safe()
         for local_point, weed in self.sort_plants(self.system.plant_provider.weeds, order='y', reverse=True,
-                                                  filter=partial(self.system.field_friend.can_reach, second_tool=True)):
+                                                  mask=partial(self.system.field_friend.can_reach_points, second_tool=True)):
             await self.system.puncher.punch(local_point.y, self.get_drill_depth(weed.type))
             self.system.plant_provider.remove_weed(weed.id)
 
     def sort_plants(self,
-                    plants: list[Plant],
+                    plants: Union[PlantStore, list[Plant]],
                     order: Literal['x', 'y'],
-                    filter: Callable[[Point], bool] = lambda _: True,
+                    mask: Optional[PointMask] = None,
                     reverse: bool = False,
-                    ) -> list[tuple[Point, Plant]]:
-        """Sort and filter plants by local x or y coordinate."""
-        local_plants: list[tuple[Point, Plant]] = []
-        for plant in plants:
-            local_point = self.system.odometer.prediction.relative_point(plant.position)
-            if filter(local_point):
-                local_plants.append((local_point, plant))
-        return sorted(local_plants, key=lambda p: p[0].x if order == 'x' else p[0].y, reverse=reverse)
+                    ) -> list[tuple[Point, Union[Plant, PlantView]]]:
+        """Sort and filter plants by local x or y coordinate (the mask is evaluated on an Nx2 array of local points)."""
+        return plant_query.sort_plants(plants, self.system.odometer.prediction, order, mask, reverse)
 
     def get_drill_depth(self, weed_type: str) -> float:
         """Return the drill depth for the given weed type in meters."""
@@ -176,7 +173,8 @@ class Weeding:
         beets = self.sort_plants(self.system.plant_provider.crops, order='x')
 
         if self.plan:
-            line = Line.from_points(self.plan[0].points[0], self.plan[0].points[-1])
+            row_points = self.plan[0].points(self.field.reference)
+            line = Line.from_points(row_points[0], row_points[-1])
         elif len(beets) > 10:
             self.log.info(f'beets: {beets}')
             positions = [beet[1].position for beet in beets[-10:]]
@@ -198,19 +196,22 @@ class Weeding:
     def needs_row_change(self) -> bool:
         if not self.plan:
             return False
-        row_yaw = self.plan[0].points[0].direction(self.plan[0].points[-1])
-        row_end_pose = Pose(x=self.plan[0].points[-1].x, y=self.plan[0].points[-1].y, yaw=row_yaw)
+        row_points = self.plan[0].points(self.field.reference)
+        row_yaw = row_points[0].direction(row_points[-1])
+        row_end_pose = Pose(x=row_points[-1].x, y=row_points[-1].y, yaw=row_yaw)
         return row_end_pose.relative_pose(self.system.odometer.prediction).x > 0
 
     async def change_row(self) -> None:
         self.log.info('Changing row...')
+        current_row_points = self.plan[0].points(self.field.reference)
+        next_row_points = self.plan[1].points(self.field.reference)
         spline = Spline.from_poses(
             Pose(
-                x=self.plan[0].points[-1].x, y=self.plan[0].points[-1].y,
-                yaw=self.plan[0].points[0].direction(self.plan[0].points[-1])),
+                x=current_row_points[-1].x, y=current_row_points[-1].y,
+                yaw=current_row_points[0].direction(current_row_points[-1])),
             Pose(
-                x=self.plan[1].points[0].x, y=self.plan[1].points[0].y,
-                yaw=self.plan[1].points[0].direction(self.plan[1].points[-1])),)
+                x=next_row_points[0].x, y=next_row_points[0].y,
+                yaw=next_row_points[0].direction(next_row_points[-1])),)
         self.plan.pop(0)
         await self.system.driver.drive_spline(spline)
 
@@ -221,24 +222,26 @@ class Weeding:
         Only considers plants that are close to the robot.
         """
         robot_position = self.system.odometer.prediction.point
-        for beet in self.system.plant_provider.crops:
-            local_beet_position = self.system.odometer.prediction.relative_point(beet.position)
-            if beet.position.distance(robot_position) > 0.5:
-                continue
-            for weed in self.system.plant_provider.weeds:
-                local_weed_position = self.system.odometer.prediction.relative_point(weed.position)
-                if weed.position.distance(robot_position) > 0.5:
+        with self.system.plant_provider.batch():
+            for beet in self.system.plant_provider.crops:
+                local_beet_position = self.system.odometer.prediction.relative_point(beet.position)
+                if beet.position.distance(robot_position) > 0.5:
                     continue
-                if beet.position.distance(weed.position) < self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY:
-                    self.log.info(f'Beet {beet} and weed {weed} are too close, moving weed away')
-                    if local_beet_position.y - local_weed_position.y > 0:
-                        local_weed_position.y = local_beet_position.y - self.system.field_friend.DRILL_RADIUS - CAMERA_UNCERTAINTY
-                        weed.position = self.system.odometer.prediction.transform(local_weed_position)
-                    else:
-                        local_weed_position.y = local_beet_position.y + self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY
-                        weed.position = self.system.odometer.prediction.transform(local_weed_position)
-                    self.log.info(f'Moved weed {weed} to {weed.position} to keep beets safe')
-        self.system.plant_provider.PLANTS_CHANGED.emit()
+                for weed in self.system.plant_provider.weeds:
+                    local_weed_position = self.system.odometer.prediction.relative_point(weed.position)
+                    if weed.position.distance(robot_position) > 0.5:
+                        continue
+                    if beet.position.distance(weed.position) < self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY:
+                        self.log.info(f'Beet {beet} and weed {weed} are too close, moving weed away')
+                        if local_beet_position.y - local_weed_position.y > 0:
+                            local_weed_position.y = local_beet_position.y - self.system.field_friend.DRILL_RADIUS - CAMERA_UNCERTAINTY
+                            self.system.plant_provider.move_weed(
+                                weed, self.system.odometer.prediction.transform(local_weed_position))
+                        else:
+                            local_weed_position.y = local_beet_position.y + self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY
+                            self.system.plant_provider.move_weed(
+                                weed, self.system.odometer.prediction.transform(local_weed_position))
+                        self.log.info(f'Moved weed {weed} to {weed.position} to keep beets safe')
 
     def set_simulated_objects(self) -> None:
         if isinstance(self.system.detector, rosys.vision.DetectorSimulation):
@@ -291,9 +294,9 @@ class Weeding:
             await rosys.sleep(3.5)
             await self.system.plant_locator.detect_plants(self.system.camera_selector.cameras['bottom_cam'])
         beets_in_chop_range = self.sort_plants(self.system.plant_provider.crops, order='y', reverse=True,
-                                               filter=self.system.field_friend.can_reach)
+                                               mask=self.system.field_friend.can_reach_points)
         weeds_in_chop_range = self.sort_plants(self.system.plant_provider.weeds, order='y', reverse=True,
-                                               filter=self.system.field_friend.can_reach)
+                                               mask=self.system.field_friend.can_reach_points)
         if not beets_in_chop_range and weeds_in_chop_range:
             self.log.info(f'weeds in chop range: {len(weeds_in_chop_range)}')
             self.log.info('No beets found in chop range, chopping weeds')
@@ -1,18 +1,21 @@
-
 import logging
 import random
 from functools import partial
-from typing import TYPE_CHECKING, Callable, Literal, Optional
+from typing import TYPE_CHECKING, Literal, Optional, Union
 
-import numpy as np
 import rosys
 from rosys.driving import PathSegment
 from rosys.geometry import Point, Point3d, Pose, Spline
 
+from . import plant_query
 from .field_provider import Field, Row
 from .plant import Plant
 from .plant_locator import DetectorError
-from .sequence import find_sequence
+from .plant_query import PointMask
+from .plant_store import PlantStore, PlantView
+from .row_crop_index import RowCropIndex
+from .row_schedule import RowActionPlanner, WeedingAction
+from .sequence import find_lane_order, lane_offsets
 
 if TYPE_CHECKING:
     from system import System
@@ -38,6 +41,12 @@ class WeedingNew:
         self.ordered_rows: list[Row] = []
         self.current_row: Optional[Row] = None
         self.task = None
+        self.use_crop_map: bool = True
+        """drive rows with mapped crops continuously along a precomputed action schedule instead of stopping for every detection"""
+        self.braking_distance: float = 0.02
+        """distance before an action at which the robot is stopped while driving along a schedule"""
+        self.schedule_interval: float = 0.01
+        """interval in which the schedule is checked for due actions while driving (in seconds)"""
 
         self.running: bool = False
 
@@ -108,40 +117,27 @@ class WeedingNew:
 
         if self.start_row is None:
             self.start_row = self.field.rows[0]
-        rows = [row for row in self.field.rows if len(row.points) > 1]
-        minimum_distance = 1
-        if len(rows) > 1:
-            rows_distance = rows[0].points[0].distance(rows[1].points[0])
-            if self.system.driver.parameters.minimum_turning_radius * 2 > rows_distance:
-                minimum_distance = int(
-                    np.ceil(self.system.driver.parameters.minimum_turning_radius * 2 / rows_distance))
-
-        self.log.info(f'Minimum distance: {minimum_distance}')
-        if minimum_distance > 1:
-            sequence = find_sequence(len(rows), minimum_distance=minimum_distance)
-            if not sequence:
-                self.log.warning('No sequence found')
-                sequence = list(range(len(rows)))
-        else:
-            sequence = list(range(len(rows)))
+        rows = [row for row in self.field.rows if len(row.points(self.field.reference)) > 1]
+        if not rows:
+            return
+        row_points = [[(point.x, point.y) for point in row.points(self.field.reference)] for row in rows]
+        sequence = find_lane_order(lane_offsets(row_points),
+                                   minimum_distance=self.system.driver.parameters.minimum_turning_radius * 2)
         while sequence and self.start_row != rows[sequence[0]]:
             sequence.pop(0)
+        self.log.info(f'Row sequence: {sequence}')
 
         paths = []
         for i, row_index in enumerate(sequence):
             splines = []
             row = rows[row_index]
             self.ordered_rows.append(row)
-            if i % 2 != 0:
-                row = row.reversed()
-            row_points = row.points.copy()
-            self.log.info(f'Row {row.id} has {row_points} points')
             if row.crops:
                 self.log.info(f'Row {row.id} has beets, creating {len(row.crops)} points')
-                for beet in row.crops:
-                    row_points.append(beet.position)
-                row_points = sorted(row_points, key=lambda point: point.distance(row_points[0]))
-                self.log.info(f'Row {row.id} has {row_points} points')
+            row_points = row.crop_index(self.field.reference).path_points()
+            if i % 2 != 0:
+                row_points = row_points[::-1]
+            self.log.info(f'Row {row.id} has {row_points} points')
             for j in range(len(row_points) - 1):
                 splines.append(Spline.from_points(row_points[j], row_points[j + 1]))
             path = [PathSegment(spline=spline) for spline in splines]
@@ -180,51 +176,153 @@ class WeedingNew:
         await self._drive_to_start()
         for i, path in enumerate(self.plan):
             self.current_row = self.ordered_rows[i]
-            for j, segment in enumerate(path):
-                self.log.info(f'Driving row {i + 1}/{len(self.plan)} and segment {j + 1}/{len(path)}...')
-                row_completed = False
-                counter = 0  # for simulation
-                await self.system.puncher.clear_view()
-                await self.system.field_friend.flashlight.turn_on()
-                await rosys.sleep(3)
-                while not row_completed:
-                    self.log.info('while not row completed...')
-                    self.task = rosys.background_tasks.create(
-                        self.system.driver.drive_spline(segment.spline), name='driving')
-                    while not self.task.done():
-                        self.log.info('while not task.done()...')
-                        self.log.info(f'Counter: {counter}')
-                        if self.is_simulation():
-                            counter += 1
-                            if counter % 2 == 0:
-                                self.set_simulated_objects()
-                                await rosys.sleep(0.5)
-                        await self.system.plant_locator.detect_plants(self.system.camera_selector.cameras['bottom_cam'])
-                        await rosys.sleep(0.1)
-                        if self.new_plants_detected:
-                            await self.system.field_friend.stop()
-                            self.task.cancel()
-                            self.new_plants_detected = False
-                            rosys.notify('New plants detected')
-                            await self._handle_new_plants()
+            if self.use_crop_map and self.current_row.crops:
+                self.log.info(f'Driving row {i + 1}/{len(self.plan)} with a schedule from its crop map...')
+                await self._drive_scheduled_row(path, reverse=i % 2 != 0)
+            else:
+                for j, segment in enumerate(path):
+                    self.log.info(f'Driving row {i + 1}/{len(self.plan)} and segment {j + 1}/{len(path)}...')
+                    row_completed = False
+                    counter = 0  # for simulation
+                    await self.system.puncher.clear_view()
+                    await self.system.field_friend.flashlight.turn_on()
+                    await rosys.sleep(3)
+                    while not row_completed:
+                        self.log.info('while not row completed...')
+                        self.task = rosys.background_tasks.create(
+                            self.system.driver.drive_spline(segment.spline), name='driving')
+                        while not self.task.done():
+                            self.log.info('while not task.done()...')
+                            self.log.info(f'Counter: {counter}')
                             if self.is_simulation():
-                                self.system.detector.simulated_objects.clear()  # simulation
-                            break
-                        await rosys.sleep(0.1)
-
-                    if self.task.cancelled():
-                        self.log.info('Task cancelled')
-                        continue
-                    else:
-                        self.log.info('Task done')
-                        row_completed = True
+                                counter += 1
+                                if counter % 2 == 0:
+                                    self.set_simulated_objects()
+                                    await rosys.sleep(0.5)
+                            await self.system.plant_locator.detect_plants(self.system.camera_selector.cameras['bottom_cam'])
+                            await rosys.sleep(0.1)
+                            if self.new_plants_detected:
+                                await self.system.field_friend.stop()
+                                self.task.cancel()
+                                self.new_plants_detected = False
+                                rosys.notify('New plants detected')
+                                await self._handle_new_plants()
+                                if self.is_simulation():
+                                    self.system.detector.simulated_objects.clear()  # simulation
+                                break
+                            await rosys.sleep(0.1)
+
+                        if self.task.cancelled():
+                            self.log.info('Task cancelled')
+                            continue
+                        else:
+                            self.log.info('Task done')
+                            row_completed = True
             await self.system.field_friend.flashlight.turn_off()
             if i < len(self.plan) - 1:
                 self.log.info('Turning')
-                turn_splines = self._generate_turn_spline(segment.spline, self.plan[i + 1][0].spline)
+                turn_splines = self._generate_turn_spline(path[-1].spline, self.plan[i + 1][0].spline)
                 await self.system.driver.drive_path(turn_splines)
         await self.system.field_friend.stop()
 
+    async def _drive_scheduled_row(self, path: list[PathSegment], reverse: bool) -> None:
+        """Drive along the row and only stop where the action schedule requires it.
+
+        The schedule is planned from the crop map of the row and the known weeds.
+        The plant locator detects in the background; new detections only update the schedule,
+        which is checked for due actions in a tight loop that does not wait for the detector.
+        Actions which have been passed nevertheless are approached backwards and executed.
+        """
+        crop_index = self.current_row.crop_index(self.field.reference)
+        planner = RowActionPlanner(crop_index, self.system.field_friend.reach_areas,
+                                   depth=self._get_drill_depth, margin=CAMERA_UNCERTAINTY + SAFETY_DISTANCE)
+        if 'drill' not in planner.tool_x:
+            raise NotImplementedError(self.system.field_friend.version)
+        actions: list[WeedingAction] = []
+        planned_weed_ids: set[str] = set()
+        planned_crop_ids: set[str] = set()
+        handled_weed_ids: set[str] = set()
+        await self.system.puncher.clear_view()
+        await self.system.field_friend.flashlight.turn_on()
+        await rosys.sleep(3)
+        self.system.plant_locator.resume()
+        try:
+            for segment in path:
+                while True:
+                    self.task = rosys.background_tasks.create(
+                        self.system.driver.drive_spline(segment.spline), name='driving')
+                    due_actions: list[WeedingAction] = []
+                    while not self.task.done():
+                        if self.is_simulation() and not self.system.detector.simulated_objects:
+                            self.set_simulated_objects()
+                        weed_ids = set(self.system.plant_provider.weeds.ids) - handled_weed_ids
+                        crop_ids = set(self.system.plant_provider.crops.ids)
+                        if weed_ids != planned_weed_ids or crop_ids != planned_crop_ids:
+                            if self.is_simulation() or self.system.gnss.record.gps_qual == 4:
+                                self._handle_row_beets()
+                            weeds = [weed for weed in self.system.plant_provider.weeds if weed.id in weed_ids]
+                            actions = planner.plan(weeds, reverse=reverse)
+                            planned_weed_ids = weed_ids
+                            planned_crop_ids = crop_ids
+                        due_actions = self._due_actions(actions, crop_index, planner)
+                        if due_actions:
+                            await self.system.field_friend.stop()
+                            self.task.cancel()
+                            break
+                        await rosys.sleep(self.schedule_interval)
+                    if not due_actions:
+                        break
+                    await self._execute_actions(due_actions, crop_index, planner)
+                    handled_weed_ids.update(weed_id for action in due_actions for weed_id in action.plant_ids)
+                    if self.is_simulation():
+                        self.system.detector.simulated_objects.clear()
+        finally:
+            self.system.plant_locator.pause()
+
+    def _due_actions(self, actions: list[WeedingAction], crop_index: RowCropIndex,
+                     planner: RowActionPlanner) -> list[WeedingAction]:
+        """Return the actions of the next stop if the robot reaches it before the next check or has already passed it.
+
+        The actions are in driving order and only contain untreated weeds, so the first one is always the next stop.
+        """
+        if not actions:
+            return []
+        action = actions[0]
+        target = self.system.odometer.prediction.relative_point(crop_index.point_at(action.station, action.y))
+        distance = target.x - planner.tool_x[action.tool]
+        velocity = self.system.odometer.current_velocity
+        travel = abs(velocity.linear) * self.schedule_interval if velocity is not None else 0.0
+        if distance > self.braking_distance + travel:
+            return []
+        return [other for other in actions if other.station == action.station]
+
+    async def _execute_actions(self, actions: list[WeedingAction], crop_index: RowCropIndex,
+                               planner: RowActionPlanner) -> None:
+        first = actions[0]
+        target = self.system.odometer.prediction.relative_point(crop_index.point_at(first.station, first.y))
+        distance = target.x - planner.tool_x[first.tool]
+        if distance > 0.005:
+            await self.system.driver.drive_to(self.system.odometer.prediction.transform(Point(x=distance, y=0)))
+        elif distance < -0.005:
+            self.log.info(f'Returning {-distance:.3f} m to the passed stop at station {first.station:.3f}')
+            await self.system.driver.drive_to(self.system.odometer.prediction.transform(Point(x=distance, y=0)),
+                                              backward=True)
+        for action in actions:
+            if action.tool == 'chop':
+                self.log.info(f'Chopping at station {action.station:.3f}')
+                await self._chop_weeds()
+                continue
+            local_target = self.system.odometer.prediction.relative_point(crop_index.point_at(action.station, action.y))
+            if not self.system.field_friend.can_reach(local_target, second_tool=True):
+                self.log.warning(f'Cannot reach scheduled punch at {local_target}, leaving weeds {action.plant_ids}')
+                continue
+            self.log.info(f'Punching at station {action.station:.3f} and y {local_target.y:.3f}')
+            await self.system.puncher.punch(local_target.y, action.depth)
+            for weed_id in action.plant_ids:
+                if self.system.plant_provider.weeds.get(weed_id) is not None:
+                    self.system.plant_provider.remove_weed(weed_id)
+        await self.system.puncher.clear_view()
+
     async def _drive_to_start(self) -> None:
         self.log.info('Driving to start...')
         start_pose = self.system.odometer.prediction
@@ -261,24 +359,22 @@ class WeedingNew:
 
     def _handle_row_beets(self) -> None:
         self.log.info('>>>Handling row beets')
+        crop_index = self.current_row.crop_index(self.field.reference)
         for beet in self.system.plant_provider.crops:
             if beet.confidence < MINIMUM_BEET_CONFIDENCE or beet.position.distance(
                     self.system.odometer.prediction.point) > 0.3:
                 continue
-            relative_beet_position = self.system.odometer.prediction.relative_point(beet.position)
-            for row_beet in self.current_row.crops:
-                row_beet_relative_position = self.system.odometer.prediction.relative_point(row_beet.position)
-                if abs(relative_beet_position.x - row_beet_relative_position.x) > 0.04:
-                    continue
+            row_beet = crop_index.nearest(beet.position, tolerance=0.04)
+            if row_beet is not None:
                 if beet.confidence > row_beet.confidence:
                     self.log.info('Beet already in row, replacing it')
-                    self.current_row.crops.remove(row_beet)
-                    self.current_row.crops.append(beet)
+                    crop_index.remove(row_beet)
+                    crop_index.insert(beet.to_plant())
                 else:
                     self.log.info('Beet already in row, keeping it')
                 return
             self.log.info('Beet not in row, adding it')
-            self.current_row.crops.append(beet)
+            crop_index.insert(beet.to_plant())
 
     async def _handle_drilling(self) -> None:
         self.log.info('>>>Handling drilling')
@@ -347,7 +443,7 @@ class WeedingNew:
         self._keep_beets_safe()
         for local_point, weed in self._sort_plants(
                 self.system.plant_provider.weeds, order='y', reverse=True,
-                filter=partial(self.system.field_friend.can_reach, second_tool=True)):
+                mask=partial(self.system.field_friend.can_reach_points, second_tool=True)):
             if last_punch_y is not None and abs(local_point.y - last_punch_y) < self.system.field_friend.DRILL_RADIUS:
                 continue
             await self.system.puncher.punch(local_point.y, self._get_drill_depth(weed.type))
@@ -361,41 +457,38 @@ class WeedingNew:
         Only considers plants that are close to the robot.
         """
         self.log.info('Keeping beets safe')
-        for beet in self.system.plant_provider.crops:
-            local_beet_position = self.system.odometer.prediction.relative_point(beet.position)
-            if local_beet_position.distance(Point(x=self.system.field_friend.WORK_X_DRILL, y=0)) > 0.25:
-                continue
-            for weed in self.system.plant_provider.weeds:
-                local_weed_position = self.system.odometer.prediction.relative_point(weed.position)
-                if local_weed_position.distance(local_beet_position) > 0.2:
+        with self.system.plant_provider.batch():
+            for beet in self.system.plant_provider.crops:
+                local_beet_position = self.system.odometer.prediction.relative_point(beet.position)
+                if local_beet_position.distance(Point(x=self.system.field_friend.WORK_X_DRILL, y=0)) > 0.25:
                     continue
-                if beet.position.distance(
-                        weed.position) < self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY + SAFETY_DISTANCE:
-                    self.log.info(f'Beet and weed are too close, moving weed {local_weed_position} away')
-                    if (local_beet_position.y - local_weed_position.y) > 0:
-                        local_weed_position.y = local_beet_position.y - self.system.field_friend.DRILL_RADIUS - CAMERA_UNCERTAINTY - SAFETY_DISTANCE
-                        weed.position = self.system.odometer.prediction.transform(local_weed_position)
-                    else:
-                        local_weed_position.y = local_beet_position.y + self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY
-                        weed.position = self.system.odometer.prediction.transform(local_weed_position)
-                        self.log.info(
-                            f'Moved weed to {local_weed_position} to keep beets safe')
-        self.system.plant_provider.PLANTS_CHANGED.emit()
+                for weed in self.system.plant_provider.weeds:
+                    local_weed_position = self.system.odometer.prediction.relative_point(weed.position)
+                    if local_weed_position.distance(local_beet_position) > 0.2:
+                        continue
+                    if beet.position.distance(
+                            weed.position) < self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY + SAFETY_DISTANCE:
+                        self.log.info(f'Beet and weed are too close, moving weed {local_weed_position} away')
+                        if (local_beet_position.y - local_weed_position.y) > 0:
+                            local_weed_position.y = local_beet_position.y - self.system.field_friend.DRILL_RADIUS - CAMERA_UNCERTAINTY - SAFETY_DISTANCE
+                            self.system.plant_provider.move_weed(
+                                weed, self.system.odometer.prediction.transform(local_weed_position))
+                        else:
+                            local_weed_position.y = local_beet_position.y + self.system.field_friend.DRILL_RADIUS + CAMERA_UNCERTAINTY
+                            self.system.plant_provider.move_weed(
+                                weed, self.system.odometer.prediction.transform(local_weed_position))
+                            self.log.info(
+                                f'Moved weed to {local_weed_position} to keep beets safe')
 
     def _sort_plants(self,
-                     plants: list[Plant],
+                     plants: Union[PlantStore, list[Plant]],
                      order: Literal['x', 'y'],
-                     filter: Callable[[Point], bool] = lambda _: True,
+                     mask: Optional[PointMask] = None,
                      reverse: bool = False,
-                     ) -> list[tuple[Point, Plant]]:
-        """Sort and filter plants by local x or y coordinate."""
+                     ) -> list[tuple[Point, Union[Plant, PlantView]]]:
+        """Sort and filter plants by local x or y coordinate (the mask is evaluated on an Nx2 array of local points)."""
         self.log.info(f'Sorting plants by {order}')
-        local_plants: list[tuple[Point, Plant]] = []
-        for plant in plants:
-            local_point = self.system.odometer.prediction.relative_point(plant.position)
-            if filter(local_point):
-                local_plants.append((local_point, plant))
-        return sorted(local_plants, key=lambda p: p[0].x if order == 'x' else p[0].y, reverse=reverse)
+        return plant_query.sort_plants(plants, self.system.odometer.prediction, order, mask, reverse)
 
     def _get_drill_depth(self, weed_type: str) -> float:
         """Return the drill depth for the given weed type in meters."""
@@ -408,9 +501,9 @@ class WeedingNew:
     async def _chop_weeds(self) -> None:
         self.log.info('Chopping weeds')
         beets_in_chop_range = self._sort_plants(self.system.plant_provider.crops, order='y', reverse=True,
-                                                filter=self.system.field_friend.can_reach)
+                                                mask=self.system.field_friend.can_reach_points)
         weeds_in_chop_range = self._sort_plants(self.system.plant_provider.weeds, order='y', reverse=True,
-                                                filter=self.system.field_friend.can_reach)
+                                                mask=self.system.field_friend.can_reach_points)
         if not beets_in_chop_range and weeds_in_chop_range:
             self.log.info(f'weeds in chop range: {len(weeds_in_chop_range)}')
             self.log.info('No beets found in chop range, chopping weeds')
@@ -47,6 +47,8 @@ class FieldFriend(rosys.hardware.Robot):
         self.bumper = bumper
         self.bms = bms
         self.safety = safety
+        self.reach_areas: dict[str, np.ndarray] = self._compute_reach_areas()
+        """reachable rectangle (x_min, x_max, y_min, y_max) in local coordinates per tool; the first tool is the main tool"""
         rosys.on_shutdown(self.stop)
 
     async def stop(self) -> None:
@@ -56,26 +58,50 @@ class FieldFriend(rosys.hardware.Robot):
         if self.z_axis:
             await self.z_axis.stop()
 
+    def _compute_reach_areas(self) -> dict[str, np.ndarray]:
+        if self.y_axis is None:
+            return {}
+        if self.version in ['ff3']:
+            return {
+                'drill': np.array([self.WORK_X - self.DRILL_RADIUS, self.WORK_X + self.DRILL_RADIUS,
+                                   self.y_axis.MIN_POSITION, self.y_axis.MAX_POSITION]),
+            }
+        if self.version in ['u2', 'u3']:
+            return {
+                'chop': np.array([self.WORK_X_CHOP - self.CHOP_RADIUS, self.WORK_X_CHOP + self.CHOP_RADIUS,
+                                  self.y_axis.MIN_POSITION, self.y_axis.MAX_POSITION]),
+                'drill': np.array([self.WORK_X_DRILL - self.DRILL_RADIUS, self.WORK_X_DRILL + self.DRILL_RADIUS,
+                                   self.y_axis.MIN_POSITION + self.y_axis.WORK_OFFSET,
+                                   self.y_axis.MAX_POSITION - self.y_axis.WORK_OFFSET]),
+            }
+        if self.version in ['u4']:
+            return {
+                'tornado': np.array([-np.inf, np.inf, self.y_axis.min_position, self.y_axis.max_position]),
+            }
+        return {}
+
+    def _reach_area(self, second_tool: bool) -> np.ndarray:
+        areas = list(self.reach_areas.values())
+        if len(areas) <= int(second_tool):
+            raise NotImplementedError(f'Version {self.version} not implemented')
+        return areas[int(second_tool)]
+
     def can_reach(self, local_point: rosys.geometry.Point, second_tool: bool = False) -> bool:
         """Check if the given point is reachable by the tool.
 
         The point is given in local coordinates, i.e. the origin is the center of the tool.
         """
-        if self.version in ['ff3']:
-            return self.WORK_X - self.DRILL_RADIUS <= local_point.x <= self.WORK_X + self.DRILL_RADIUS \
-                and self.y_axis.MIN_POSITION <= local_point.y <= self.y_axis.MAX_POSITION
-        elif self.version in ['u2', 'u3']:
-            if not second_tool:
-                work_x = self.WORK_X_CHOP
-                tool_radius = self.CHOP_RADIUS
-                return work_x - tool_radius <= local_point.x <= work_x + tool_radius \
-                    and self.y_axis.MIN_POSITION <= local_point.y <= self.y_axis.MAX_POSITION
-            else:
-                work_x = self.WORK_X_DRILL
-                tool_radius = self.DRILL_RADIUS
-                return work_x - tool_radius <= local_point.x <= work_x + tool_radius \
-                    and self.y_axis.MIN_POSITION+self.y_axis.WORK_OFFSET <= local_point.y <= self.y_axis.MAX_POSITION-self.y_axis.WORK_OFFSET
-        elif self.version in ['u4']:
-            return self.y_axis.min_position <= local_point.y <= self.y_axis.max_position
-        else:
-            raise NotImplementedError(f'Version {self.version} not implemented')
+        x_min, x_max, y_min, y_max = self._reach_area(second_tool)
+        return bool(x_min <= local_point.x <= x_max and y_min <= local_point.y <= y_max)
+
+    def can_reach_points(self, local_points: np.ndarray, second_tool: bool = False) -> np.ndarray:
+        """Return a boolean mask of the given Nx2 local points which are reachable by the tool."""
+        x_min, x_max, y_min, y_max = self._reach_area(second_tool)
+        x, y = local_points[:, 0], local_points[:, 1]
+        return (x_min <= x) & (x <= x_max) & (y_min <= y) & (y <= y_max)
+
+    def reachable(self, local_points: np.ndarray) -> dict[str, np.ndarray]:
+        """Return a boolean mask of the given Nx2 local points for each tool (e.g. "chop" and "drill")."""
+        x, y = local_points[:, 0], local_points[:, 1]
+        return {tool: (x_min <= x) & (x <= x_max) & (y_min <= y) & (y <= y_max)
+                for tool, (x_min, x_max, y_min, y_max) in self.reach_areas.items()}
@@ -29,15 +29,16 @@ class field_object(Group):
                     Extrusion(outline, 0.5, wireframe=True).with_name(f'field_{field.id}').material('black')
 
                 for obstacle in field.obstacles:
-                    outline = [[point.x, point.y] for point in obstacle.points]
+                    outline = [[point.x, point.y] for point in obstacle.points(field.reference)]
                     Extrusion(outline, 0.1).with_name(f'obstacle_{obstacle.id}').material('#B80F0A')
 
                 for row in field.rows:
-                    if len(row.points) == 1:
+                    row_points = row.points(field.reference)
+                    if len(row_points) == 1:
                         continue
                     else:
-                        for i in range(len(row.points) - 1):
-                            spline = Spline.from_points(row.points[i], row.points[i + 1])
+                        for i in range(len(row_points) - 1):
+                            spline = Spline.from_points(row_points[i], row_points[i + 1])
                             Curve(
                                 [spline.start.x, spline.start.y, 0],
                                 [spline.control1.x, spline.control1.y, 0],
@@ -45,7 +46,7 @@ class field_object(Group):
                                 [spline.end.x, spline.end.y, 0],
                             ).material('#6c541e').with_name(f'row_{row.id}_{i}')
 
-                    for point in row.points:
+                    for point in row_points:
                         with self.scene:
                             Sphere(0.07).move(x=point.x, y=point.y, z=0.01).material(
                                 '#ff8800').with_name(f'row_{row.id}_point')
@@ -118,7 +118,7 @@ class field_planner:
                 with ui.row().style('width: 100%'):
                     ui.icon('fence').props('size=lg color=primary').style(
                         "display:block; margin-top:auto; margin-bottom: auto;")
-                    ui.input(value=f'{self.field_provider.active_field.name}').on('blur', self.field_provider.invalidate).bind_value(
+                    ui.input(value=f'{self.field_provider.active_field.name}').on('blur', lambda: self.field_provider.invalidate(field=self.field_provider.active_field)).bind_value(
                         self.field_provider.active_field, 'name').classes('w-32')
                     ui.button(on_click=lambda field=self.field_provider.active_field: self.delete_field(field)) \
                         .props('icon=delete color=warning fab-mini flat').classes('ml-auto').style('display: block; margin-top:auto; margin-bottom: auto;').tooltip('Delete field')
@@ -199,17 +199,16 @@ class field_planner:
                         ui.icon('dangerous').props('size=sm color=primary').style(
                             "display:block; margin-top:auto; margin-bottom: auto;")
                         ui.input(
-                            'Obstacle name', value=f'{self.field_provider.active_object["object"].name}').on('blur', self.field_provider.invalidate).bind_value(
+                            'Obstacle name', value=f'{self.field_provider.active_object["object"].name}').on('blur', lambda: self.field_provider.invalidate(field=self.field_provider.active_field)).bind_value(
                             self.field_provider.active_object['object'], 'name').classes('w-32')
                         ui.button(on_click=lambda field=self.field_provider.active_field, obstacle=self.field_provider.active_object['object']: self.field_provider.remove_obstacle(field, obstacle)).props(
                             'icon=delete color=warning fab-mini flat').classes('ml-auto').style("display:block; margin-top:auto; margin-bottom: auto;").tooltip('Delete obstacle')
                     with ui.column().style("display: block; overflow: auto; width: 100%"):
                         if self.coordinate_type == "cartesian":
-                            points = self.field_provider.active_object['object'].points(
-                                [self.field_provider.active_field.reference_lat, self.field_provider.active_field.reference_lon])
+                            points = self.field_provider.active_object['object'].points(self.field_provider.active_field.reference)
                             for point in points:
                                 with ui.row().style("width: 100%;"):
-                                    ui.button(on_click=lambda point=point: self.leafet_map.m.set_center(self.field_provider.active_object['object'].points_wgs84[self.field_provider.active_object['object'].points([self.field_provider.active_field.reference_lat, self.field_provider.active_field.reference_lon]).index(point)])).props(
+                                    ui.button(on_click=lambda point=point: self.leafet_map.m.set_center(self.field_provider.active_object['object'].points_wgs84[self.field_provider.active_object['object'].points(self.field_provider.active_field.reference).index(point)])).props(
                                         'icon=place color=primary fab-mini flat').tooltip('center map on point').classes('ml-0')
                                     ui.label(f'x: {float("{:.2f}".format(point.x))}')
                                     ui.label(f'y: {float("{:.2f}".format(point.y))}')
@@ -242,17 +241,16 @@ class field_planner:
                                 'icon=expand_less color=primary fab-mini flat').style("display:block; margin-top:auto; margin-bottom: auto; margin-left: 0; margin-right: 0;")
                             ui.button(on_click=lambda row=self.field_provider.active_object['object']: self.move_row(self.field_provider.active_field, row, next=True)) .props(
                                 'icon=expand_more color=primary fab-mini flat').classes('ml-auto').style("display:block; margin-top:auto; margin-bottom: auto; margin-left: 0; margin-right: 0;")
-                        ui.input(value=self.field_provider.active_object['object'].name).on('blur', self.field_provider.invalidate).bind_value(
+                        ui.input(value=self.field_provider.active_object['object'].name).on('blur', lambda: self.field_provider.invalidate(field=self.field_provider.active_field)).bind_value(
                             self.field_provider.active_object['object'], 'name').classes('w-32')
                         ui.button(on_click=lambda row=self.field_provider.active_object['object']: self.field_provider.remove_row(self.field_provider.active_field, row)).props(
                             'icon=delete color=warning fab-mini flat').classes('ml-auto').style("display:block; margin-top:auto; margin-bottom: auto;").tooltip('Delete Row')
                     with ui.column().style("display: block; overflow: auto; width: 100%"):
                         if self.coordinate_type == "cartesian":
-                            points = self.field_provider.active_object['object'].points(
-                                [self.field_provider.active_field.reference_lat, self.field_provider.active_field.reference_lon])
+                            points = self.field_provider.active_object['object'].points(self.field_provider.active_field.reference)
                             for point in points:
                                 with ui.row().style("width: 100%;"):
-                                    ui.button(on_click=lambda point=point: self.leafet_map.m.set_center(self.field_provider.active_object['object'].points_wgs84[self.field_provider.active_object['object'].points([self.field_provider.active_field.reference_lat, self.field_provider.active_field.reference_lon]).index(point)])).props(
+                                    ui.button(on_click=lambda point=point: self.leafet_map.m.set_center(self.field_provider.active_object['object'].points_wgs84[self.field_provider.active_object['object'].points(self.field_provider.active_field.reference).index(point)])).props(
                                         'icon=place color=primary fab-mini flat').tooltip('center map on point').classes('ml-0')
                                     ui.label(f'x: {float("{:.2f}".format(point.x))}')
                                     ui.label(f'y: {float("{:.2f}".format(point.y))}')
@@ -325,7 +323,7 @@ class field_planner:
                 self.field_provider.active_field.reference_lon = new_point[1]
                 self.gnss.set_reference(lat=new_point[0], lon=new_point[1])
             field.outline_wgs84.append(new_point)
-        self.field_provider.invalidate()
+        self.field_provider.invalidate(field=field)
 
     def remove_point(self, field: Field, point: Optional[list] = None) -> None:
         if point is not None:
@@ -333,7 +331,7 @@ class field_planner:
             del field.outline_wgs84[index]
         elif field.outline_wgs84 != []:
             del field.outline_wgs84[-1]
-        self.field_provider.invalidate()
+        self.field_provider.invalidate(field=field)
 
     def add_field(self) -> None:
         new_id = str(uuid.uuid4())
@@ -380,7 +378,7 @@ class field_planner:
                 new_point = positioning
             obstacle.points_wgs84.append(new_point)
         self.field_provider.select_object(self.field_provider.active_object['object'].id, self.tab)
-        self.field_provider.invalidate()
+        self.field_provider.invalidate(field=field)
 
     def remove_obstacle_point(self, obstacle: FieldObstacle, point: Optional[list] = None) -> None:
         if obstacle.points_wgs84 != []:
@@ -390,7 +388,7 @@ class field_planner:
             else:
                 del obstacle.points_wgs84[-1]
             self.field_provider.select_object(self.field_provider.active_object['object'].id, self.tab)
-            self.field_provider.invalidate()
+            self.field_provider.invalidate(field=self.field_provider.active_field)
 
     def add_row(self, field: Field) -> None:
         row = Row(id=f'{str(uuid.uuid4())}', name=f'{str(uuid.uuid4())}', points_wgs84=[])
@@ -423,7 +421,7 @@ class field_planner:
                 new_point = positioning
             row.points_wgs84.append(new_point)
         self.field_provider.select_object(self.field_provider.active_object['object'].id, self.tab)
-        self.field_provider.invalidate()
+        self.field_provider.invalidate(field=field)
 
     def remove_row_point(self, row: Row, point: Optional[list] = None) -> None:
         if row.points_wgs84 != []:
@@ -433,7 +431,7 @@ class field_planner:
             else:
                 del row.points_wgs84[-1]
             self.field_provider.select_object(self.field_provider.active_object['object'].id, self.tab)
-            self.field_provider.invalidate()
+            self.field_provider.invalidate(field=self.field_provider.active_field)
 
     def move_row(self, field: Field, row: Row, next: bool = False) -> None:
         index = field.rows.index(row)
@@ -444,4 +442,4 @@ class field_planner:
                 field.rows[index], field.rows[index+1] = field.rows[index+1], field.rows[index]
         else:
             field.rows[index], field.rows[index-1] = field.rows[index-1], field.rows[index]
-        self.field_provider.invalidate()
+        self.field_provider.invalidate(field=field)
@@ -1,7 +1,10 @@
+import json
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import rosys
-from nicegui import ui
+from nicegui import app, ui
+from starlette.responses import FileResponse
 
 if TYPE_CHECKING:
     from field_friend.system import System
@@ -32,7 +35,7 @@ def header_bar(system: 'System', right_drawer: ui.right_drawer) -> None:
         with ui.button().props('icon=settings flat color=white'):
             with ui.menu().props(remove='no-parent-event'):
                 with ui.column().classes('gap-0'):
-                    rosys.persistence.export_button() \
+                    export_button() \
                         .props('flat align=left').classes('w-full')
                     rosys.persistence.import_button(after_import=system.restart) \
                         .props('flat align=left').classes('w-full')
@@ -41,3 +44,17 @@ def header_bar(system: 'System', right_drawer: ui.right_drawer) -> None:
                     ui.menu_item('Restart Lizard', on_click=system.field_friend.robot_brain.restart)
                 ui.menu_item('Clear GNSS reference', on_click=system.gnss.clear_reference)
         ui.button(on_click=right_drawer.toggle).props('icon=menu flat color=white')
+
+
+def export_button(route: str = '/export', tmp_filepath: Path = Path('/tmp/export.json')) -> ui.button:
+    """Like `rosys.persistence.export_button`, but uses the `export` method of modules which provide one.
+
+    This way modules which keep their data in separate files (like the field provider) export the data itself.
+    """
+    @app.get(route)
+    def get_export() -> FileResponse:
+        data = {name: getattr(module, 'export', module.backup)()
+                for name, module in rosys.persistence.registry.modules.items()}
+        tmp_filepath.write_text(json.dumps(data, indent=4, cls=rosys.persistence.registry.Encoder))
+        return FileResponse(tmp_filepath, filename='export.json')
+    return ui.button('Export', on_click=lambda: ui.download(route[1:]))
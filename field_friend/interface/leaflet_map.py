@@ -96,12 +96,7 @@ class leaflet_map:
         self.gnss.clear_reference()
         self.gnss.set_reference(latlon[0], latlon[1])
         self.gnss.ROBOT_POSITION_LOCATED.emit()
-        self.gnss.ROBOT_POSE_LOCATED.emit(rosys.geometry.Pose(
-            x=0.000,
-            y=0.000,
-            yaw=0.0,
-            time=0
-        ))
+        self.system.pose_filter.reset(rosys.geometry.Pose(x=0.0, y=0.0, yaw=0.0))
         dialog.close()
         self.m.remove_layer(self.drawn_marker)
         ui.notify(f'Robot reference has been set to {latlon[0]}, {latlon[1]}')
@@ -1,8 +1,9 @@
 import logging
+from typing import Optional
 
 from nicegui.elements.scene_objects import Group, Sphere
 
-from ..automations import PlantProvider
+from ..automations import PlantProvider, PlantsChange
 
 
 class plant_objects(Group):
@@ -13,19 +14,33 @@ class plant_objects(Group):
         self.plant_provider = plant_provider
         self.weed_category_names = weed_category_names
         self.log = logging.getLogger('field_friend.plant_objects')
+        self.spheres: dict[str, Sphere] = {}
         self.update()
         self.plant_provider.PLANTS_CHANGED.register_ui(self.update)
 
-    def update(self) -> None:
-        in_world = {p.id: p for p in self.plant_provider.weeds+self.plant_provider.crops}
-        rendered = {o.name.split(':')[1]: o for o in self.scene.objects.values()
-                    if o.name and o.name.startswith('plant_')}
-        for id, obj in rendered.items():
-            if id not in in_world:
-                obj.delete()
+    def update(self, change: Optional[PlantsChange] = None) -> None:
+        if change is None:
+            in_world = {*self.plant_provider.weeds.ids, *self.plant_provider.crops.ids}
+            rendered = {o.name.split(':')[1]: o for o in self.scene.objects.values()
+                        if o.name and o.name.startswith('plant_')}
+            self.spheres = {id: obj for id, obj in rendered.items() if id in in_world}
+            change = PlantsChange(added=in_world - rendered.keys(), removed=rendered.keys() - in_world)
+            for id in change.removed:
+                rendered[id].delete()
+            change.removed.clear()
+        for id in change.removed:
+            sphere = self.spheres.pop(id, None)
+            if sphere is not None:
+                sphere.delete()
+        for id in change.moved:
+            plant = self.plant_provider.get_plant(id)
+            if plant is not None and id in self.spheres:
+                self.spheres[id].move(plant.position.x, plant.position.y, 0.02)
         with self.scene:
-            for id, plant in in_world.items():
-                if id not in rendered:
-                    Sphere(0.02).with_name(f'plant_{plant.type}:{id}') \
-                        .material('#ef1208' if plant.type in self.weed_category_names else '#11ede3') \
-                        .move(plant.position.x, plant.position.y, 0.02)
+            for id in change.added:
+                plant = self.plant_provider.get_plant(id)
+                if plant is None or id in self.spheres:
+                    continue
+                self.spheres[id] = Sphere(0.02).with_name(f'plant_{plant.type}:{id}') \
+                    .material('#ef1208' if plant.type in self.weed_category_names else '#11ede3') \
+                    .move(plant.position.x, plant.position.y, 0.02)
@@ -1 +1,2 @@
-from .gnss import Gnss, GnssHardware, GnssSimulation
+from .gnss import Gnss, GnssHardware, GnssReplay, GnssSimulation
+from .pose_filter import PoseFilter
@@ -1,20 +1,22 @@
 from __future__ import annotations
 
-import datetime
 import logging
 from abc import ABC, abstractmethod
 from copy import deepcopy
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Protocol, Union
+from typing import Any, BinaryIO, Dict, List, Optional, Protocol, Union
 
 import numpy as np
-import pynmea2
 import rosys
 import serial
 from geographiclib.geodesic import Geodesic
 from serial.tools import list_ports
 
-from field_friend.navigation.point_transformation import cartesian_to_wgs84, wgs84_to_cartesian
+from field_friend.navigation.point_transformation import local_projection
+
+from .gnss_epoch import GnssEpoch
+from .nmea import NmeaParser
+from .sbf import SbfParser
 
 
 @dataclass
@@ -37,7 +39,7 @@ class Gnss(rosys.persistence.PersistentModule, ABC):
         self.log = logging.getLogger('field_friend.gnss')
 
         self.ROBOT_POSE_LOCATED = rosys.event.Event()
-        """the robot has been located (argument: pose) with RTK-fixed"""
+        """the robot has been located (argument: pose) with RTK-fixed; the yaw is NaN if no heading was received"""
 
         self.ROBOT_POSITION_LOCATED = rosys.event.Event()
         """the robot has been located"""
@@ -95,6 +97,8 @@ class GnssHardware(Gnss):
     def __init__(self, odometer: rosys.driving.Odometer) -> None:
         super().__init__()
         self.odometer = odometer
+        self.parser = SbfParser(NmeaParser())
+        self.recording: Optional[BinaryIO] = None
 
     async def try_connection(self) -> None:
         await super().try_connection()
@@ -115,78 +119,69 @@ class GnssHardware(Gnss):
         self.log.info(f'Connecting to GNSS device "{self.device}"')
         try:
             self.ser = serial.Serial(self.device, baudrate=115200, timeout=0.5)
+            self.parser = SbfParser(NmeaParser())
         except serial.SerialException as e:
             self.log.error(f'Could not connect to GNSS device: {e}')
             self.device = None
 
     async def update(self) -> None:
+        """Continuously read the serial stream and handle every fix epoch as soon as it is complete."""
         await super().update()
         if self.ser is None:
             return
-        record = GNSSRecord()
-        has_location = False
-        has_heading = False
         try:
-            lines = await rosys.run.io_bound(self.ser.readlines)
-            if not lines:
-                self.log.info('No data')
-                return
-            for line in lines:
-                if not line:
-                    self.log.info('No data')
-                    continue
-                try:
-                    msg = await rosys.run.cpu_bound(pynmea2.parse, line.decode())
-                    if not hasattr(msg, 'sentence_type'):
-                        self.log.info(f'No sentence type: {msg}')
-                        continue
-                    if msg.sentence_type == 'GGA' and getattr(msg, 'gps_qual', 0) > 0:
-                        # self.log.info(f'GGA: gps_qual: {msg.gps_qual}, lat:{msg.latitude} and long:{msg.longitude}')
-                        record.gps_qual = msg.gps_qual
-                        record.altitude = msg.altitude
-                        record.separation = msg.geo_sep
-                    if getattr(msg, 'spd_over_grnd_kmph', None) is not None:
-                        record.speed_kmh = msg.spd_over_grnd_kmph
-                    if msg.sentence_type == 'GNS' and getattr(msg, 'mode_indicator', None):
-                        # self.log.info(f'GNS: mode: {msg.mode_indicator}, lat:{msg.latitude} and long:{msg.longitude}')
-                        if isinstance(msg.timestamp, datetime.time):
-                            dt = datetime.datetime.combine(datetime.date.today(), msg.timestamp)
-                            dt.replace(tzinfo=datetime.timezone.utc)
-                            record.timestamp = dt.timestamp()
-                        else:
-                            record.timestamp = msg.timestamp
-                        record.latitude = msg.latitude
-                        record.longitude = msg.longitude
-                        record.mode = msg.mode_indicator
-                        has_location = True
-                    if msg.sentence_type == 'HDT' and getattr(msg, 'heading', None) is not None:
-                        # self.log.info(f'HDT: Heading: {msg.heading}')
-                        record.heading = msg.heading
-                        has_heading = True
-                except pynmea2.ParseError as e:
-                    self.log.info(f'Parse error: {e}')
-                    continue
+            while self.ser is not None:
+                data = await rosys.run.io_bound(self._read)
+                if data is None:
+                    return  # rosys is stopping
+                if self.recording is not None:
+                    self.recording.write(data)
+                for epoch in self.parser.feed(data):
+                    self._handle_epoch(epoch)
         except serial.SerialException as e:
             self.log.info(f'Device error: {e}')
             self.device = None
-            return
+
+    def start_recording(self, path: str) -> None:
+        """Write the raw receiver stream into a file which can be replayed with GnssReplay."""
+        self.stop_recording()
+        self.recording = open(path, 'wb')
+        self.log.info(f'Recording GNSS stream to {path}')
+
+    def stop_recording(self) -> None:
+        if self.recording is not None:
+            self.recording.close()
+            self.recording = None
+
+    def _read(self) -> bytes:
+        """Read all available bytes or block until the first byte arrives (at most for the serial timeout)."""
+        return self.ser.read(max(1, self.ser.in_waiting))
+
+    def _handle_epoch(self, epoch: GnssEpoch) -> None:
+        record = GNSSRecord(
+            timestamp=epoch.timestamp,
+            latitude=epoch.latitude,
+            longitude=epoch.longitude,
+            mode=epoch.mode,
+            gps_qual=epoch.gps_qual,
+            altitude=epoch.altitude,
+            separation=epoch.separation,
+            heading=epoch.heading or 0.0,
+            speed_kmh=epoch.speed_kmh or 0.0,
+        )
         self.record = record
-        if has_location:
+        if epoch.has_location:
             if record.gps_qual == 4:  # 4 = RTK fixed, 5 = RTK float
                 if self.reference_lat is None or self.reference_lon is None:
                     self.log.info(f'GNSS reference set to {record.latitude}, {record.longitude}')
                     self.set_reference(record.latitude, record.longitude)
                 else:
-                    cartesian_coordinates = wgs84_to_cartesian([self.reference_lat, self.reference_lon], [
-                        record.latitude, record.longitude])
-                    if has_heading:
-                        yaw = np.deg2rad(float(-record.heading))
-                    else:
-                        yaw = self.odometer.get_pose(time=record.timestamp).yaw
-                        # TODO: Better INS implementation if no heading provided by GNSS
+                    cartesian_coordinates = local_projection(self.reference_lat, self.reference_lon).to_cartesian(
+                        [record.latitude, record.longitude])[0]
+                    yaw = np.deg2rad(float(-record.heading)) if epoch.heading is not None else np.nan
                     pose = rosys.geometry.Pose(
-                        x=cartesian_coordinates[0],
-                        y=cartesian_coordinates[1],
+                        x=float(cartesian_coordinates[0]),
+                        y=float(cartesian_coordinates[1]),
                         yaw=yaw,
                         time=record.timestamp,
                     )
@@ -206,6 +201,60 @@ class GnssHardware(Gnss):
         self.request_backup()
 
 
+class GnssReplay(GnssHardware):
+    """Replays a recorded NMEA/SBF stream through the same parsers and events as the hardware.
+
+    Epochs are emitted at the recorded pace divided by `speed` (0 replays as fast as possible).
+    Their timestamps are shifted to the current RoSys time, so odometry and pose fusion can process them as live data.
+    """
+
+    def __init__(self, odometer: rosys.driving.Odometer, path: str, *,
+                 speed: float = 1.0, loop: bool = False, chunk_size: int = 4096) -> None:
+        super().__init__(odometer)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.chunk_size = chunk_size
+        self.file: Optional[BinaryIO] = None
+        self.is_finished = False
+        self.epoch_count = 0
+
+    async def try_connection(self) -> None:
+        if self.file is not None or self.is_finished:
+            return
+        try:
+            self.file = open(self.path, 'rb')
+        except OSError as e:
+            self.log.error(f'Could not open GNSS recording: {e}')
+            self.is_finished = True
+            return
+        self.device = self.path
+        self.parser = SbfParser(NmeaParser())
+        self.log.info(f'Replaying GNSS recording "{self.path}"')
+
+    async def update(self) -> None:
+        if self.file is None:
+            return
+        recording_start: Optional[float] = None
+        replay_start = rosys.time()
+        while data := await rosys.run.io_bound(self.file.read, self.chunk_size):
+            for epoch in self.parser.feed(data):
+                if recording_start is None:
+                    recording_start = epoch.timestamp
+                if self.speed > 0:
+                    target_time = replay_start + (epoch.timestamp - recording_start) / self.speed
+                    if target_time > rosys.time():
+                        await rosys.sleep(target_time - rosys.time())
+                epoch.timestamp = rosys.time()
+                self.epoch_count += 1
+                self._handle_epoch(epoch)
+        self.file.close()
+        self.file = None
+        self.device = None
+        self.is_finished = not self.loop
+        self.log.info(f'Replayed {self.epoch_count} GNSS epochs from "{self.path}"')
+
+
 class PoseProvider(Protocol):
 
     @property
@@ -225,11 +274,11 @@ class GnssSimulation(Gnss):
         pose = deepcopy(self.pose_provider.pose)
         pose.time = rosys.time()
         await rosys.sleep(0.5)
-        current_position = cartesian_to_wgs84([self.reference_lat, self.reference_lon], [pose.x, pose.y])
+        current_position = local_projection(self.reference_lat, self.reference_lon).to_wgs84([pose.x, pose.y])[0]
 
         self.record.timestamp = pose.time
-        self.record.latitude = current_position[0]
-        self.record.longitude = current_position[1]
+        self.record.latitude = float(current_position[0])
+        self.record.longitude = float(current_position[1])
         self.record.mode = "simulation"  # TODO check for possible values and replace "simulation"
         self.record.gps_qual = 8
         self.ROBOT_POSITION_LOCATED.emit()
@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from typing import Optional, Union
+
+
+@dataclass(slots=True, kw_only=True)
+class GnssEpoch:
+    """All measurements of a single GNSS fix epoch, independent of the receiver protocol."""
+    time: Optional[Union[str, int]] = None
+    """protocol-specific epoch identifier (NMEA UTC time string or SBF time of week)"""
+    timestamp: float = 0.0
+    latitude: float = 0.0
+    longitude: float = 0.0
+    mode: str = ''
+    gps_qual: int = 0
+    """fix quality as reported in NMEA GGA sentences (4 = RTK fixed, 5 = RTK float)"""
+    altitude: float = 0.0
+    separation: float = 0.0
+    heading: Optional[float] = None
+    speed_kmh: Optional[float] = None
+    has_quality: bool = False
+    has_location: bool = False
+
+    @property
+    def is_complete(self) -> bool:
+        return self.has_quality and self.has_location and self.heading is not None
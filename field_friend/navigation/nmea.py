@@ -0,0 +1,173 @@
+import datetime
+import logging
+from typing import Optional
+
+from .gnss_epoch import GnssEpoch
+
+log = logging.getLogger('field_friend.nmea')
+
+
+class NmeaParser:
+    """Incremental parser for the GGA, GNS, HDT, VTG, RMC and ZDA sentences of a GNSS receiver.
+
+    Raw bytes are fed in arbitrary chunks; incomplete lines are kept until the rest arrives.
+    Sentences are grouped by their UTC time. The receiver sends the sentences of every epoch in the same order,
+    so the sentence type which closes the first epoch is remembered and later epochs are returned as soon as it arrives.
+    Sentences without a time field (HDT, VTG) belong to the epoch which is open when they arrive.
+    The UTC date is taken from RMC or ZDA sentences; without them it is advanced when the time of day wraps around.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = b''
+        self.epoch = GnssEpoch()
+        self.errors = 0
+        self.last_sentence: Optional[str] = None
+        """sentence type which closes an epoch (learned from the stream)"""
+        self.date: Optional[datetime.date] = None
+        """UTC date of the current epoch"""
+        self._seconds: Optional[float] = None
+        """UTC time of day of the current epoch (in seconds)"""
+        self._sentences: list[str] = []
+        """types of the sentences in the open epoch"""
+
+    def feed(self, data: bytes) -> list[GnssEpoch]:
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b'\n')
+        epochs: list[GnssEpoch] = []
+        for line in lines:
+            epoch = self.parse_line(line.strip())
+            if epoch is not None:
+                epochs.append(epoch)
+        return epochs
+
+    def parse_line(self, line: bytes) -> Optional[GnssEpoch]:
+        """Parse a single line and return an epoch if it has been completed by this line."""
+        fields = self._split(line)
+        if fields is None or len(fields[0]) != 5:
+            return None
+        try:
+            sentence_type = fields[0][2:]
+            if sentence_type == 'GGA':
+                finished = self._parse_gga(fields)
+            elif sentence_type == 'GNS':
+                finished = self._parse_gns(fields)
+            elif sentence_type == 'RMC':
+                finished = self._parse_rmc(fields)
+            elif sentence_type == 'ZDA':
+                finished = self._parse_zda(fields)
+            elif sentence_type == 'HDT':
+                finished = None
+                if fields[1]:
+                    self.epoch.heading = float(fields[1])
+            elif sentence_type == 'VTG':
+                finished = None
+                if len(fields) > 7 and fields[7]:
+                    self.epoch.speed_kmh = float(fields[7])
+            else:
+                return None
+        except (ValueError, IndexError) as e:
+            self.errors += 1
+            log.debug(f'Could not parse {line!r}: {e}')
+            return None
+        self._sentences.append(sentence_type)
+        if finished is None and sentence_type == self.last_sentence:
+            finished = self._close_epoch()
+        return finished
+
+    def _split(self, line: bytes) -> Optional[list[str]]:
+        if not line.startswith(b'$'):
+            return None
+        body, _, checksum = line[1:].partition(b'*')
+        if checksum:
+            computed = 0
+            for byte in body:
+                computed ^= byte
+            try:
+                if computed != int(checksum[:2], 16):
+                    self.errors += 1
+                    return None
+            except ValueError:
+                self.errors += 1
+                return None
+        return body.decode('ascii', errors='replace').split(',')
+
+    def _start_epoch(self, time: str) -> Optional[GnssEpoch]:
+        """Switch to the epoch of the given time and return the previous epoch if it contained any data."""
+        if self.epoch.time == time:
+            return None
+        if self.epoch.time is None:
+            self.epoch.time = time
+            self.epoch.timestamp = self._timestamp(time)
+            return None
+        if self.last_sentence is None and self._sentences:
+            self.last_sentence = self._sentences[-1]
+        finished = self._close_epoch()
+        self.epoch.time = time
+        self.epoch.timestamp = self._timestamp(time)
+        return finished
+
+    def _close_epoch(self) -> Optional[GnssEpoch]:
+        """Return the open epoch if it contained any data and open an empty one."""
+        finished = self.epoch if self.epoch.has_quality or self.epoch.has_location else None
+        self.epoch = GnssEpoch()
+        self._sentences = []
+        return finished
+
+    def _parse_gga(self, fields: list[str]) -> Optional[GnssEpoch]:
+        finished = self._start_epoch(fields[1])
+        self.epoch.gps_qual = int(fields[6] or 0)
+        self.epoch.altitude = float(fields[9] or 0.0)
+        self.epoch.separation = float(fields[11] or 0.0)
+        self.epoch.has_quality = True
+        return finished
+
+    def _parse_gns(self, fields: list[str]) -> Optional[GnssEpoch]:
+        finished = self._start_epoch(fields[1])
+        if fields[2] and fields[4] and fields[6]:
+            self.epoch.latitude = self._degrees(fields[2], fields[3], 2)
+            self.epoch.longitude = self._degrees(fields[4], fields[5], 3)
+            self.epoch.mode = fields[6]
+            self.epoch.has_location = True
+        return finished
+
+    def _parse_rmc(self, fields: list[str]) -> Optional[GnssEpoch]:
+        finished = self._start_epoch(fields[1])
+        if len(fields[9]) == 6:
+            self._set_date(datetime.date(2000 + int(fields[9][4:]), int(fields[9][2:4]), int(fields[9][:2])))
+        return finished
+
+    def _parse_zda(self, fields: list[str]) -> Optional[GnssEpoch]:
+        finished = self._start_epoch(fields[1])
+        if fields[2] and fields[3] and fields[4]:
+            self._set_date(datetime.date(int(fields[4]), int(fields[3]), int(fields[2])))
+        return finished
+
+    def _set_date(self, date: datetime.date) -> None:
+        """Use the date reported by the receiver for the open epoch and all following ones."""
+        self.date = date
+        if self._seconds is not None:
+            self.epoch.timestamp = self._midnight() + self._seconds
+
+    @staticmethod
+    def _degrees(value: str, hemisphere: str, digits: int) -> float:
+        degrees = float(value[:digits]) + float(value[digits:]) / 60.0
+        return -degrees if hemisphere in ('S', 'W') else degrees
+
+    def _timestamp(self, time: str) -> float:
+        if len(time) < 6:
+            return 0.0
+        seconds = int(time[:2]) * 3600 + int(time[2:4]) * 60 + float(time[4:])
+        if self.date is None:
+            # until the receiver reports a date, use the one which puts the epoch closest to the system clock
+            now = datetime.datetime.now(datetime.timezone.utc)
+            self.date = min((now.date() + datetime.timedelta(days=days) for days in (-1, 0, 1)),
+                            key=lambda date: abs(self._midnight(date) + seconds - now.timestamp()))
+        elif self._seconds is not None and seconds < self._seconds - 12 * 3600:
+            self.date += datetime.timedelta(days=1)  # midnight has passed
+        self._seconds = seconds
+        return self._midnight() + seconds
+
+    def _midnight(self, date: Optional[datetime.date] = None) -> float:
+        date = date or self.date
+        assert date is not None
+        return datetime.datetime.combine(date, datetime.time(), tzinfo=datetime.timezone.utc).timestamp()
@@ -1,6 +1,12 @@
+from functools import lru_cache
+
 import numpy as np
 from geographiclib.geodesic import Geodesic
 
+WGS84_A = Geodesic.WGS84.a
+WGS84_F = Geodesic.WGS84.f
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
 
 def wgs84_to_cartesian(reference, point):
     r = Geodesic.WGS84.Inverse(reference[0], reference[1], point[0], point[1])
@@ -17,3 +23,57 @@ def cartesian_to_wgs84(reference, point):
     r = Geodesic.WGS84.Direct(r['lat2'], r['lon2'], 0.0, point[1])
     wgs84_coords = [r['lat2'], r['lon2']]
     return wgs84_coords
+
+
+def _to_ecef(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Convert geodetic coordinates in radians on the ellipsoid surface into Nx3 ECEF coordinates."""
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat)**2)
+    return np.stack([n * np.cos(lat) * np.cos(lon),
+                     n * np.cos(lat) * np.sin(lon),
+                     n * (1 - WGS84_E2) * np.sin(lat)], axis=-1)
+
+
+class LocalProjection:
+    """Orthographic projection onto the tangent plane of the WGS84 ellipsoid at a reference point.
+
+    Uses the same local frame as `wgs84_to_cartesian` (x pointing north, y pointing west).
+    Whole arrays are converted at once without solving geodesics per point;
+    within a few kilometers of the reference the deviation from the geodesic solution stays below a millimeter.
+    """
+
+    def __init__(self, reference_lat: float, reference_lon: float) -> None:
+        self.reference_lat = reference_lat
+        self.reference_lon = reference_lon
+        lat, lon = np.deg2rad(reference_lat), np.deg2rad(reference_lon)
+        self.origin = _to_ecef(np.array(lat), np.array(lon))
+        self.up = np.array([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+        north = np.array([-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)])
+        west = np.array([np.sin(lon), -np.cos(lon), 0.0])
+        self.rotation = np.stack([north, west])
+        """rows are the local x (north) and y (west) axes in ECEF coordinates"""
+
+    def to_cartesian(self, points: np.ndarray) -> np.ndarray:
+        """Convert an Nx2 array of latitudes and longitudes in degrees into Nx2 local coordinates in meters."""
+        points = np.deg2rad(np.asarray(points, dtype=float).reshape(-1, 2))
+        return (_to_ecef(points[:, 0], points[:, 1]) - self.origin) @ self.rotation.T
+
+    def to_wgs84(self, points: np.ndarray) -> np.ndarray:
+        """Convert an Nx2 array of local coordinates in meters into Nx2 latitudes and longitudes in degrees."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        q = self.origin + points @ self.rotation
+        # move along the up axis until the ellipsoid surface is hit: solve a quadratic equation for the offset u
+        scale = np.array([1.0, 1.0, 1 / (1 - WGS84_E2)]) / WGS84_A**2
+        a = np.sum(self.up**2 * scale)
+        b = 2 * np.sum(q * self.up * scale, axis=1)
+        c = np.sum(q**2 * scale, axis=1) - 1
+        u = -2 * c / (b + np.sqrt(b**2 - 4 * a * c))  # the root closer to zero in a numerically stable form
+        surface = q + u[:, None] * self.up
+        lat = np.arctan2(surface[:, 2], (1 - WGS84_E2) * np.hypot(surface[:, 0], surface[:, 1]))
+        lon = np.arctan2(surface[:, 1], surface[:, 0])
+        return np.rad2deg(np.stack([lat, lon], axis=1))
+
+
+@lru_cache(maxsize=16)
+def local_projection(reference_lat: float, reference_lon: float) -> LocalProjection:
+    """Return the (cached) tangent-plane projection for the given reference point."""
+    return LocalProjection(reference_lat, reference_lon)
@@ -0,0 +1,156 @@
+import logging
+
+import numpy as np
+import rosys
+from rosys.driving import Odometer
+from rosys.geometry import Pose, Velocity
+from rosys.helpers import eliminate_2pi
+
+from .gnss import Gnss
+
+
+class PoseFilter:
+    """Extended Kalman filter fusing wheel odometry with absolute GNSS poses.
+
+    The state (x, y, yaw) is predicted with every velocity measurement of the wheels and corrected with every GNSS pose.
+    GNSS poses are delayed; they are moved to the current time with the motion recorded by the odometer since then.
+    Each correction is forwarded to the odometer, so driver and automations follow the smoothed estimate
+    instead of jumping to every raw fix.
+    """
+
+    def __init__(self, wheels: rosys.hardware.Wheels, odometer: Odometer, gnss: Gnss) -> None:
+        self.log = logging.getLogger('field_friend.pose_filter')
+        self.odometer = odometer
+
+        self.POSE_UPDATED = rosys.event.Event()
+        """the filtered pose has been predicted or corrected (argument: pose)"""
+
+        self.pose = Pose()
+        self.covariance = np.diag([1e6, 1e6, np.pi**2])
+        """covariance of x, y and yaw"""
+        self.is_initialized = False
+
+        self.linear_noise = 0.05
+        """standard deviation of the driven distance relative to the distance"""
+        self.lateral_noise = 0.01
+        """standard deviation of the lateral drift relative to the driven distance"""
+        self.angular_noise = 0.05
+        """standard deviation of the rotation relative to the rotation"""
+        self.yaw_drift = 0.02
+        """standard deviation of the rotation per driven meter (rad/m)"""
+        self.position_std = 0.03
+        """standard deviation of a GNSS position (m)"""
+        self.heading_std = np.deg2rad(1.0)
+        """standard deviation of a GNSS heading (rad)"""
+        self.outlier_threshold = 16.0
+        """squared Mahalanobis distance above which a GNSS pose is rejected"""
+        self.max_rejections = 3
+        """number of consecutive rejections after which the filter is reset to the GNSS pose"""
+        self._rejections = 0
+
+        wheels.VELOCITY_MEASURED.register(self.handle_velocities)
+        gnss.ROBOT_POSE_LOCATED.register(self.handle_gnss_pose)
+
+    def handle_velocities(self, velocities: list[Velocity]) -> None:
+        if not self.is_initialized:
+            return
+        for velocity in velocities:
+            dt = velocity.time - self.pose.time
+            if dt > 0:
+                self._predict(dt * velocity.linear, dt * velocity.angular)
+            self.pose.time = velocity.time
+        self.POSE_UPDATED.emit(self.pose)
+
+    def _predict(self, distance: float, rotation: float) -> None:
+        yaw = self.pose.yaw
+        cos, sin = np.cos(yaw), np.sin(yaw)
+        self.pose.x += distance * cos
+        self.pose.y += distance * sin
+        self.pose.yaw += rotation
+        jacobian = np.array([[1, 0, -distance * sin], [0, 1, distance * cos], [0, 0, 1]])
+        longitudinal = (self.linear_noise * distance)**2
+        lateral = (self.lateral_noise * distance)**2
+        rotation_variance = (self.angular_noise * rotation)**2 + (self.yaw_drift * distance)**2
+        noise = np.array([
+            [longitudinal * cos**2 + lateral * sin**2, (longitudinal - lateral) * cos * sin, 0],
+            [(longitudinal - lateral) * cos * sin, longitudinal * sin**2 + lateral * cos**2, 0],
+            [0, 0, rotation_variance],
+        ])
+        self.covariance = jacobian @ self.covariance @ jacobian.T + noise
+
+    def handle_gnss_pose(self, gnss_pose: Pose) -> None:
+        """Correct the state with a GNSS pose; a NaN yaw means that the receiver did not provide a heading."""
+        has_heading = not np.isnan(gnss_pose.yaw)
+        measurement = self._propagate(gnss_pose, has_heading)
+        if not self.is_initialized:
+            self._reset(measurement, has_heading)
+            return
+
+        rows = [0, 1, 2] if has_heading else [0, 1]
+        H = np.eye(3)[rows]
+        R = np.diag([self.position_std**2, self.position_std**2, self.heading_std**2])[np.ix_(rows, rows)]
+        innovation = np.array([measurement.x - self.pose.x, measurement.y - self.pose.y,
+                               eliminate_2pi(measurement.yaw - self.pose.yaw)])[rows]
+        S = H @ self.covariance @ H.T + R
+        S_inv = np.linalg.inv(S)
+        if innovation @ S_inv @ innovation > self.outlier_threshold:
+            self._rejections += 1
+            if self._rejections < self.max_rejections:
+                self.log.warning(f'rejected GNSS pose {gnss_pose} as outlier')
+                return
+            self.log.warning(f'GNSS poses are inconsistent with odometry, resetting to {gnss_pose}')
+            self._reset(measurement, has_heading)
+            return
+        self._rejections = 0
+
+        K = self.covariance @ H.T @ S_inv
+        correction = K @ innovation
+        self.pose.x += correction[0]
+        self.pose.y += correction[1]
+        self.pose.yaw = eliminate_2pi(self.pose.yaw + correction[2])
+        A = np.eye(3) - K @ H
+        self.covariance = A @ self.covariance @ A.T + K @ R @ K.T  # Joseph form keeps the covariance symmetric
+        self._publish()
+
+    def _propagate(self, gnss_pose: Pose, has_heading: bool) -> Pose:
+        """Move a delayed GNSS pose to the current time using the odometry recorded since the measurement."""
+        if not self.odometer.history:
+            return Pose(x=gnss_pose.x, y=gnss_pose.y, yaw=gnss_pose.yaw,
+                        time=self.pose.time if self.is_initialized else rosys.time())
+        then_local = self.odometer.get_pose(gnss_pose.time, local=True)
+        now_local = self.odometer.history[-1]
+        motion = then_local.relative_pose(now_local)
+        if has_heading:
+            yaw = gnss_pose.yaw
+        elif self.is_initialized:
+            yaw = self.pose.yaw - motion.yaw
+        else:
+            yaw = self.odometer.prediction.yaw - motion.yaw
+        return Pose(
+            x=gnss_pose.x + motion.x * np.cos(yaw) - motion.y * np.sin(yaw),
+            y=gnss_pose.y + motion.x * np.sin(yaw) + motion.y * np.cos(yaw),
+            yaw=yaw + motion.yaw if has_heading else np.nan,
+            time=now_local.time,
+        )
+
+    def reset(self, pose: Pose) -> None:
+        """Discard the current estimate and its covariance and restart the filter at the given pose.
+
+        Unlike a GNSS pose, the given pose is not checked against the current estimate.
+        """
+        has_heading = not np.isnan(pose.yaw)
+        self._reset(Pose(x=pose.x, y=pose.y, yaw=pose.yaw, time=rosys.time()), has_heading)
+
+    def _reset(self, measurement: Pose, has_heading: bool) -> None:
+        self.pose = Pose(x=measurement.x, y=measurement.y,
+                         yaw=measurement.yaw if has_heading else self.odometer.prediction.yaw,
+                         time=measurement.time)
+        self.covariance = np.diag([self.position_std**2, self.position_std**2,
+                                   self.heading_std**2 if has_heading else np.pi**2])
+        self.is_initialized = True
+        self._rejections = 0
+        self._publish()
+
+    def _publish(self) -> None:
+        self.odometer.handle_detection(Pose(x=self.pose.x, y=self.pose.y, yaw=self.pose.yaw, time=self.pose.time))
+        self.POSE_UPDATED.emit(self.pose)
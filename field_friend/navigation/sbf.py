@@ -0,0 +1,176 @@
+import binascii
+import logging
+import math
+import re
+import struct
+from typing import Optional
+
+from .gnss_epoch import GnssEpoch
+from .nmea import NmeaParser
+
+log = logging.getLogger('field_friend.sbf')
+
+SYNC = b'$@'
+HEADER = struct.Struct('<2sHHH')
+"""sync, CRC, block ID (with revision in the upper 3 bits), block length"""
+PVT_GEODETIC = struct.Struct('<IHBBdddfffff')
+"""TOW, WNc, mode, error, latitude, longitude, height, undulation, Vn, Ve, Vu, COG"""
+ATT_EULER = struct.Struct('<IHBBHHffffff')
+"""TOW, WNc, NrSV, error, mode, reserved, heading, pitch, roll, pitch dot, roll dot, heading dot"""
+PVT_GEODETIC_ID = 4007
+ATT_EULER_ID = 5938
+DO_NOT_USE = -2e10
+"""values below half of the do-not-use value are invalid (float32 fields do not represent it exactly)"""
+MAX_BLOCK_LENGTH = 4096
+NMEA_PREFIX = re.compile(rb'\$(?:[A-Z]{5}|P[A-Z]{3,4}),')
+"""talker and sentence identifier (or proprietary prefix) which has to follow a `$` to start an NMEA sentence"""
+NMEA_PREFIX_LENGTH = 7
+MAX_NMEA_LENGTH = 128
+
+GPS_EPOCH = 315964800  # 1980-01-06 in Unix time
+LEAP_SECONDS = 18
+SECONDS_PER_WEEK = 604800
+
+PVT_MODES = {
+    # SBF PVT mode: (NMEA GGA quality, mode indicator)
+    0: (0, 'N'),
+    1: (1, 'A'),
+    2: (2, 'D'),
+    3: (7, 'M'),
+    4: (4, 'R'),
+    5: (5, 'F'),
+    6: (2, 'D'),
+    7: (4, 'R'),
+    8: (5, 'F'),
+    10: (1, 'P'),
+}
+
+
+class SbfParser:
+    """Incremental decoder for Septentrio Binary Format (SBF) streams with PVTGeodetic and AttEuler blocks.
+
+    Blocks are decoded in place from the receive buffer with precompiled structs and verified with their CRC.
+    NMEA sentences interleaved in the same stream are passed on to an NmeaParser line by line;
+    a `$` only starts a sentence if it is followed by a valid talker and sentence identifier.
+    Blocks with the same time of week form an epoch, which is returned as soon as position and heading are known
+    or the next epoch begins.
+    """
+
+    def __init__(self, nmea_parser: Optional[NmeaParser] = None) -> None:
+        self.nmea_parser = nmea_parser
+        self.buffer = bytearray()
+        self.epoch = GnssEpoch()
+        self.errors = 0
+
+    def feed(self, data: bytes) -> list[GnssEpoch]:
+        self.buffer += data
+        epochs: list[GnssEpoch] = []
+        buffer = self.buffer
+        view = memoryview(buffer)
+        try:
+            position = 0
+            while True:
+                start = buffer.find(b'$', position)
+                if start < 0:
+                    position = len(buffer)
+                    break
+                if len(buffer) - start < 2:
+                    position = start
+                    break
+                if buffer[start + 1] != SYNC[1]:
+                    if len(buffer) - start < NMEA_PREFIX_LENGTH:
+                        position = start
+                        break
+                    if not NMEA_PREFIX.match(buffer, start):  # a stray `$` byte
+                        position = start + 1
+                        continue
+                    end = buffer.find(b'\n', start, start + MAX_NMEA_LENGTH)
+                    if end < 0:
+                        if len(buffer) - start < MAX_NMEA_LENGTH:
+                            position = start
+                            break
+                        self.errors += 1
+                        position = start + 1
+                        continue
+                    interrupted = buffer.find(b'$', start + 1, end)
+                    if interrupted >= 0:  # the sentence is truncated, e.g. by an SBF block
+                        self.errors += 1
+                        position = interrupted
+                        continue
+                    if self.nmea_parser is not None:
+                        epoch = self.nmea_parser.parse_line(bytes(view[start:end]).strip())
+                        if epoch is not None:
+                            epochs.append(epoch)
+                    position = end + 1
+                    continue
+                if len(buffer) - start < HEADER.size:
+                    position = start
+                    break
+                _, crc, block_id, length = HEADER.unpack_from(buffer, start)
+                if length < HEADER.size or length % 4 or length > MAX_BLOCK_LENGTH:
+                    self.errors += 1
+                    position = start + 1
+                    continue
+                if len(buffer) - start < length:
+                    position = start
+                    break
+                if binascii.crc_hqx(view[start + 4:start + length], 0) != crc:
+                    log.debug(f'CRC mismatch in SBF block {block_id & 0x1fff}')
+                    self.errors += 1
+                    position = start + 1
+                    continue
+                epoch = self._parse_block(block_id & 0x1fff, buffer, start + HEADER.size, length - HEADER.size)
+                if epoch is not None:
+                    epochs.append(epoch)
+                position = start + length
+        finally:
+            view.release()
+        del buffer[:position]
+        return epochs
+
+    def _parse_block(self, block_number: int, buffer: bytearray, offset: int, size: int) -> Optional[GnssEpoch]:
+        if block_number == PVT_GEODETIC_ID and size >= PVT_GEODETIC.size:
+            tow, wnc, mode, error, latitude, longitude, height, undulation, vn, ve, _, _ = \
+                PVT_GEODETIC.unpack_from(buffer, offset)
+            finished = self._start_epoch(tow, wnc)
+            gps_qual, mode_indicator = PVT_MODES.get(mode & 0x0f, (0, 'N'))
+            self.epoch.gps_qual = gps_qual if error == 0 else 0
+            self.epoch.has_quality = True
+            if error == 0 and latitude > DO_NOT_USE / 2 and longitude > DO_NOT_USE / 2:
+                self.epoch.latitude = math.degrees(latitude)
+                self.epoch.longitude = math.degrees(longitude)
+                self.epoch.altitude = height - undulation
+                self.epoch.separation = undulation
+                self.epoch.mode = mode_indicator
+                self.epoch.has_location = gps_qual > 0
+                if vn > DO_NOT_USE / 2 and ve > DO_NOT_USE / 2:
+                    self.epoch.speed_kmh = math.hypot(vn, ve) * 3.6
+            return finished or self._finish_if_complete()
+        if block_number == ATT_EULER_ID and size >= ATT_EULER.size:
+            tow, wnc, _, error, _, _, heading, _, _, _, _, _ = ATT_EULER.unpack_from(buffer, offset)
+            finished = self._start_epoch(tow, wnc)
+            if error & 0x03 == 0 and heading > DO_NOT_USE / 2:
+                self.epoch.heading = heading
+            return finished or self._finish_if_complete()
+        return None
+
+    def _start_epoch(self, tow: int, wnc: int) -> Optional[GnssEpoch]:
+        """Switch to the epoch of the given time of week and return the previous epoch if it contained any data."""
+        if self.epoch.time == tow:
+            return None
+        timestamp = GPS_EPOCH + wnc * SECONDS_PER_WEEK + tow / 1000 - LEAP_SECONDS
+        if self.epoch.time is None:
+            self.epoch.time = tow
+            self.epoch.timestamp = timestamp
+            return None
+        finished = self.epoch if self.epoch.has_quality or self.epoch.has_location else None
+        self.epoch = GnssEpoch(time=tow, timestamp=timestamp)
+        return finished
+
+    def _finish_if_complete(self) -> Optional[GnssEpoch]:
+        if not self.epoch.is_complete:
+            return None
+        finished = self.epoch
+        self.epoch = GnssEpoch()
+        return finished
+
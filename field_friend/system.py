@@ -8,8 +8,13 @@ import rosys
 from field_friend.automations import (BatteryWatcher, CoinCollecting, DemoWeeding, FieldProvider, Mowing, PathProvider,
                                       PathRecorder, PlantLocator, PlantProvider, Puncher, Weeding, WeedingNew)
 from field_friend.hardware import FieldFriendHardware, FieldFriendSimulation
-from field_friend.navigation import GnssHardware, GnssSimulation
-from field_friend.vision import CameraConfigurator, SimulatedCam, SimulatedCamProvider, UsbCamProvider
+from field_friend.navigation import GnssHardware, GnssSimulation, PoseFilter
+from field_friend.vision import (CameraConfigurator, SimulatedCam, SimulatedCamProvider, SimulatedDetector,
+                                 UsbCamProvider)
+
+DETECTOR_PORTS = [8004, 8004]
+"""port of every detector connection; each connection has at most one image in flight,
+so several connections (also to the same detector node) pipeline the detection of consecutive frames"""
 
 
 class System:
@@ -21,7 +26,8 @@ class System:
         if self.is_real:
             self.field_friend = FieldFriendHardware(version=version)
             self.usb_camera_provider = UsbCamProvider()
-            self.detector = rosys.vision.DetectorHardware(port=8004)
+            self.detectors: list[rosys.vision.Detector] = \
+                [rosys.vision.DetectorHardware(port=port) for port in DETECTOR_PORTS]
             # self.circle_sight = CircleSight()
         else:
             self.field_friend = FieldFriendSimulation(version=version)
@@ -32,8 +38,9 @@ class System:
                                                                                roll=np.deg2rad(360-150),
                                                                                pitch=np.deg2rad(0),
                                                                                yaw=np.deg2rad(90)))
-            self.detector = rosys.vision.DetectorSimulation(self.usb_camera_provider)
+            self.detectors = [SimulatedDetector(self.usb_camera_provider, capacity=len(DETECTOR_PORTS))]
             # self.circle_sight = None
+        self.detector = self.detectors[0]
         self.camera_configurator = CameraConfigurator(self.usb_camera_provider, version)
         self.plant_provider = PlantProvider()
         self.field_provider = FieldProvider()
@@ -43,7 +50,7 @@ class System:
             self.gnss = GnssHardware(self.odometer)
         else:
             self.gnss = GnssSimulation(self.field_friend.wheels)
-        self.gnss.ROBOT_POSE_LOCATED.register(self.forward_pose_odometer)
+        self.pose_filter = PoseFilter(self.field_friend.wheels, self.odometer, self.gnss)
         self.driver = rosys.driving.Driver(self.field_friend.wheels, self.odometer)
         self.driver.parameters.linear_speed_limit = 0.1
         self.driver.parameters.angular_speed_limit = 1.0
@@ -57,6 +64,7 @@ class System:
         self.small_weed_category_names = ['weed', 'coin']
         self.crop_category_names = ['sugar_beet', 'crop', 'coin_with_hole']
         self.plant_locator = PlantLocator(self.usb_camera_provider, self.detector, self.plant_provider, self.odometer)
+        self.plant_locator.detectors = self.detectors
         self.plant_locator.weed_category_names = self.big_weed_category_names + self.small_weed_category_names
         self.plant_locator.crop_category_names = self.crop_category_names
 
@@ -112,8 +120,5 @@ class System:
         self.steerer.STEERING_STARTED.register(pause)
         self.field_friend.estop.ESTOP_TRIGGERED.register(stop)
 
-    def forward_pose_odometer(self, pose: rosys.geometry.Pose) -> None:
-        self.odometer.handle_detection(pose)
-
     def restart(self) -> None:
         os.utime('main.py')
@@ -3,6 +3,7 @@ from .camera_configurator import CameraConfigurator
 from .circle_sight import CircleSight
 from .simulated_cam import SimulatedCam
 from .simulated_cam_provider import SimulatedCamProvider
+from .simulated_detector import SimulatedDetector
 from .usb_cam import UsbCam
 from .usb_cam_provider import UsbCamProvider
 
@@ -12,6 +13,7 @@ __all__ = [
     'UsbCamProvider',
     'SimulatedCam',
     'SimulatedCamProvider',
+    'SimulatedDetector',
     'CameraConfigurator',
     'configurations',
 ]
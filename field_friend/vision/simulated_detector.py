@@ -0,0 +1,30 @@
+import rosys
+
+
+class SimulatedDetector(rosys.vision.DetectorSimulation):
+    """Local stand-in for a remote detector node.
+
+    Every request takes `latency` seconds and at most `capacity` requests are processed at the same time.
+    Like the detector hardware, requests beyond the capacity are not queued but return without detections.
+    This allows pipelined detection to be exercised in simulation without a GPU detector.
+    """
+
+    def __init__(self, camera_provider: rosys.vision.CalibratableCameraProvider, *,
+                 latency: float = 0.0, capacity: int = 1, **kwargs) -> None:
+        super().__init__(camera_provider, **kwargs)
+        self.latency = latency
+        self.capacity = capacity
+        self.active = 0
+        """number of requests which are currently processed"""
+
+    async def detect(self, image: rosys.vision.Image, *args) -> None:
+        if self.active >= self.capacity:
+            self.log.warning(f'detector is busy, skipping {image.id}')
+            return
+        self.active += 1
+        try:
+            if self.latency:
+                await rosys.sleep(self.latency)
+            await super().detect(image, *args)
+        finally:
+            self.active -= 1
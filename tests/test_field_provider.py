@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import pytest
+from rosys.geometry import Point
+
+from field_friend.automations import Field, FieldProvider, Plant, Row
+from field_friend.automations import field_provider as field_provider_module
+
+
+@pytest.fixture
+def fields_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(field_provider_module, 'FIELDS_PATH', tmp_path)
+    return tmp_path
+
+
+def make_field(field_id: str) -> Field:
+    crop = Plant(id=f'{field_id}-crop', type='sugar_beet', position=Point(x=1.0, y=0.0), detection_time=0.0)
+    row = Row(id=f'{field_id}-row', name='row', points_wgs84=[[51.0, 7.0], [51.0001, 7.0]], crops=[crop])
+    return Field(id=field_id, name=field_id, outline_wgs84=[[51.0, 7.0], [51.0, 7.001], [51.001, 7.0]],
+                 reference_lat=51.0, reference_lon=7.0, rows=[row])
+
+
+def test_fields_are_restored_from_their_files(fields_path: Path):
+    provider = FieldProvider()
+    provider.add_field(make_field('a'))
+    provider.add_field(make_field('b'))
+    data = provider.backup()
+    assert sorted(path.name for path in fields_path.iterdir()) == ['a.json', 'b.json']
+    restored = FieldProvider()
+    restored.restore(data)
+    assert [f.id for f in restored.fields] == ['a', 'b']
+    assert restored.fields[0].rows[0].crops[0].position.x == 1.0
+
+
+def test_unreadable_field_files_are_kept(fields_path: Path):
+    provider = FieldProvider()
+    provider.add_field(make_field('a'))
+    provider.add_field(make_field('b'))
+    data = provider.backup()
+    (fields_path / 'b.json').write_text('{"truncated')
+    restored = FieldProvider()
+    restored.restore(data)
+    assert [f.id for f in restored.fields] == ['a']
+    restored.invalidate()
+    assert restored.backup() == {'field_ids': ['a', 'b']}
+    assert (fields_path / 'b.json').read_text() == '{"truncated'
+
+
+def test_field_files_survive_a_missing_module_backup(fields_path: Path):
+    provider = FieldProvider()
+    provider.add_field(make_field('a'))
+    provider.add_field(make_field('b'))
+    provider.backup()
+    restarted = FieldProvider()  # restore is not called without a module backup
+    restarted.invalidate()
+    assert restarted.backup() == {'field_ids': []}
+    assert sorted(path.name for path in fields_path.iterdir()) == ['a.json', 'b.json']
+
+
+def test_removed_fields_are_deleted(fields_path: Path):
+    provider = FieldProvider()
+    provider.add_field(make_field('a'))
+    provider.add_field(make_field('b'))
+    provider.add_field(make_field('c'))
+    provider.backup()
+    provider.remove_field(provider.fields[1])
+    assert provider.backup() == {'field_ids': ['a', 'c']}
+    assert sorted(path.name for path in fields_path.iterdir()) == ['a.json', 'c.json']
+    provider.clear_fields()
+    assert provider.backup() == {'field_ids': []}
+    assert not list(fields_path.iterdir())
+
+
+def test_export_can_be_imported(fields_path: Path):
+    provider = FieldProvider()
+    provider.add_field(make_field('a'))
+    export = provider.export()
+    for path in fields_path.iterdir():
+        path.unlink()
+    imported = FieldProvider()
+    imported.restore(export)
+    assert [f.id for f in imported.fields] == ['a']
+    imported.backup()
+    assert (fields_path / 'a.json').exists()
@@ -0,0 +1,107 @@
+import asyncio
+import math
+from pathlib import Path
+
+import pytest
+import rosys
+from nicegui import background_tasks, core
+from test_sbf import LATITUDE, LONGITUDE, att, pvt
+
+from field_friend.navigation import GnssReplay
+
+EPOCH_COUNT = 10
+EPOCH_INTERVAL = 0.1
+FIXED_EPOCHS = [i for i in range(EPOCH_COUNT) if i % 4 != 3]
+
+
+class Clock:
+    """Replaces the RoSys time so the replay pace can be checked without waiting."""
+
+    def __init__(self) -> None:
+        self.time = 1000.0
+
+    async def sleep(self, seconds: float) -> None:
+        self.time += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(rosys, 'time', lambda: clock.time)
+    monkeypatch.setattr(rosys, 'sleep', clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def recording(tmp_path: Path) -> Path:
+    """Ten epochs at 10 Hz; every fourth one is only RTK float."""
+    data = b''
+    for i in range(EPOCH_COUNT):
+        tow = 123_456_000 + i * int(EPOCH_INTERVAL * 1000)
+        data += pvt(tow, mode=4 if i in FIXED_EPOCHS else 5) + att(tow, heading=10.0 * i)
+    path = tmp_path / 'gnss.sbf'
+    path.write_bytes(data)
+    return path
+
+
+def create_replay(path: Path, **kwargs) -> tuple[GnssReplay, list[rosys.geometry.Pose], list[None]]:
+    replay = GnssReplay(rosys.driving.Odometer(rosys.hardware.WheelsSimulation()), str(path), **kwargs)
+    replay.reference_lat = LATITUDE
+    replay.reference_lon = LONGITUDE
+    poses: list[rosys.geometry.Pose] = []
+    positions: list[None] = []
+    replay.ROBOT_POSE_LOCATED.register(poses.append)
+    replay.ROBOT_POSITION_LOCATED.register(lambda: positions.append(None))
+    return replay, poses, positions
+
+
+def replay_once(replay: GnssReplay) -> None:
+    """Run one connection and update cycle on an event loop which also delivers the emitted events."""
+    async def run() -> None:
+        core.loop = asyncio.get_running_loop()
+        try:
+            await replay.try_connection()
+            await replay.update()
+            await asyncio.gather(*background_tasks.running_tasks)
+        finally:
+            core.loop = None
+    asyncio.run(run())
+
+
+def test_recording_is_replayed_faster(clock: Clock, recording: Path):
+    replay, poses, positions = create_replay(recording, speed=4.0)
+    start = clock.time
+    replay_once(replay)
+    assert replay.epoch_count == EPOCH_COUNT
+    assert len(positions) == EPOCH_COUNT
+    assert len(poses) == len(FIXED_EPOCHS)
+    for pose, i in zip(poses, FIXED_EPOCHS):
+        assert pose.time == pytest.approx(start + i * EPOCH_INTERVAL / 4.0)
+        assert pose.yaw == pytest.approx(math.radians(-10.0 * i))
+        assert pose.x == pytest.approx(0.0, abs=1e-6) and pose.y == pytest.approx(0.0, abs=1e-6)
+    assert clock.time - start == pytest.approx((EPOCH_COUNT - 1) * EPOCH_INTERVAL / 4.0)
+    assert replay.is_finished and replay.file is None
+
+
+def test_replay_stops_at_the_end_without_loop(clock: Clock, recording: Path):
+    replay, poses, _ = create_replay(recording, speed=0)
+    replay_once(replay)
+    replay_once(replay)
+    assert replay.epoch_count == EPOCH_COUNT
+    assert len(poses) == len(FIXED_EPOCHS)
+    assert all(pose.time == clock.time for pose in poses)
+
+
+def test_replay_restarts_with_loop(clock: Clock, recording: Path):
+    replay, poses, positions = create_replay(recording, speed=2.0, loop=True)
+    replay_once(replay)
+    assert not replay.is_finished and replay.file is None
+    replay_once(replay)
+    assert replay.epoch_count == 2 * EPOCH_COUNT
+    assert len(positions) == 2 * EPOCH_COUNT
+    assert len(poses) == 2 * len(FIXED_EPOCHS)
+    first, second = poses[:len(FIXED_EPOCHS)], poses[len(FIXED_EPOCHS):]
+    assert [pose.yaw for pose in second] == pytest.approx([pose.yaw for pose in first])
+    assert second[0].time >= first[-1].time
+    offsets = [pose.time - first[0].time for pose in first]
+    assert [pose.time - second[0].time for pose in second] == pytest.approx(offsets)
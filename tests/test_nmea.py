@@ -0,0 +1,53 @@
+import datetime
+from functools import reduce
+
+from field_friend.navigation.nmea import NmeaParser
+
+
+def sentence(body: str) -> bytes:
+    checksum = reduce(lambda a, b: a ^ b, body.encode(), 0)
+    return f'${body}*{checksum:02X}\r\n'.encode()
+
+
+def epoch(time: str, *, heading: str = '123.4', date: str = '') -> bytes:
+    data = sentence(f'GPGGA,{time},5158.9895,N,00726.0527,E,4,12,0.6,52.1,M,47.4,M,1.0,0000')
+    data += sentence(f'GNGNS,{time},5158.9895,N,00726.0527,E,RR,12,0.6,52.1,47.4,1.0,0000,V')
+    if date:
+        data += sentence(f'GPRMC,{time},A,5158.9895,N,00726.0527,E,0.1,0.0,{date},,,R,V')
+    data += sentence(f'GPHDT,{heading},T')
+    data += sentence('GPVTG,0.0,T,,M,0.1,N,0.2,K,R')
+    return data
+
+
+def test_epochs_are_returned_with_their_last_sentence():
+    parser = NmeaParser()
+    assert parser.feed(epoch('120000.00')) == []
+    first, second = parser.feed(epoch('120000.10', heading='10.0'))
+    assert parser.last_sentence == 'VTG'
+    assert first.time == '120000.00' and first.heading == 123.4 and first.speed_kmh == 0.2
+    assert second.time == '120000.10' and second.heading == 10.0
+    third, = parser.feed(epoch('120000.20', heading='20.0'))
+    assert third.time == '120000.20' and third.heading == 20.0
+
+
+def test_heading_before_the_timed_sentences_belongs_to_the_next_epoch():
+    parser = NmeaParser()
+    parser.last_sentence = 'GNS'
+    parser.feed(sentence('GPHDT,45.0,T'))
+    result, = parser.feed(epoch('120000.00').split(b'$GPHDT')[0])
+    assert result.heading == 45.0
+
+
+def test_date_is_taken_from_rmc():
+    parser = NmeaParser()
+    parser.feed(epoch('235959.90', date='311223') + epoch('000000.00', date='010124') + epoch('000000.10'))
+    result, = parser.feed(epoch('000000.20'))
+    expected = datetime.datetime(2024, 1, 1, 0, 0, 0, 200_000, tzinfo=datetime.timezone.utc).timestamp()
+    assert abs(result.timestamp - expected) < 1e-6
+
+
+def test_date_rolls_over_at_midnight_without_date_sentences():
+    parser = NmeaParser()
+    _, before = parser.feed(epoch('235959.80') + epoch('235959.90'))
+    after, = parser.feed(epoch('000000.00'))
+    assert abs(after.timestamp - before.timestamp - 0.1) < 1e-6
@@ -0,0 +1,84 @@
+import math
+import random
+import time
+
+import numpy as np
+import pytest
+from rosys.geometry import Point
+
+from field_friend.automations import Plant, PlantProvider
+from field_friend.automations.plant_index import PlantIndex
+from field_friend.automations.plant_provider import WEED_MATCH_DISTANCE
+
+
+def weed(x: float, y: float, confidence: float = 0.5) -> Plant:
+    return Plant(type='weed', position=Point(x=x, y=y), detection_time=0.0, confidence=confidence)
+
+
+def test_repeated_detections_are_fused():
+    plant_provider = PlantProvider()
+    plant_provider.add_weed(weed(1.0, 0.0))
+    plant_provider.add_weed(weed(1.0 + WEED_MATCH_DISTANCE / 2, 0.0))
+    assert len(plant_provider.weeds) == 1
+
+
+def test_detections_at_match_distance_are_distinct():
+    plant_provider = PlantProvider()
+    plant_provider.add_weed(weed(1.0, 0.0))
+    plant_provider.add_weed(weed(1.0 + WEED_MATCH_DISTANCE, 0.0))
+    assert len(plant_provider.weeds) == 2
+
+
+def test_radius_queries_match_brute_force():
+    random.seed(0)
+    plant_provider = PlantProvider()
+    for _ in range(1000):
+        plant_provider.add_weed(weed(random.uniform(0, 5), random.uniform(-0.5, 0.5)))
+    center = Point(x=2.5, y=0.0)
+    expected = {view.id for view in plant_provider.weeds if view.position.distance(center) < 0.3}
+    assert {view.id for view in plant_provider.get_weeds_near(center, 0.3)} == expected
+
+
+def row_detections(batch: int) -> list[Plant]:
+    """10k detections on the next 100 m of a row, like a robot driving along it."""
+    start = batch * 100.0
+    return [weed(random.uniform(start, start + 100), random.uniform(-0.15, 0.15)) for _ in range(10_000)]
+
+
+def visited_candidates(index: PlantIndex, point: Point, radius: float) -> int:
+    """Number of plants in the grid cells a radius query around the point has to look at."""
+    cells = [(i, j)
+             for i in range(math.floor((point.x - radius) / index.cell_size),
+                            math.floor((point.x + radius) / index.cell_size) + 1)
+             for j in range(math.floor((point.y - radius) / index.cell_size),
+                            math.floor((point.y + radius) / index.cell_size) + 1)]
+    return sum(len(index._cells.get(cell, {})) for cell in cells)  # pylint: disable=protected-access
+
+
+def test_lookup_cost_does_not_grow_with_the_map():
+    """Inserting 100k detections along a 1 km row must not increase the work of a single lookup."""
+    random.seed(0)
+    plant_provider = PlantProvider()
+    candidates = []
+    for batch in range(10):
+        detections = row_detections(batch)
+        for detection in detections:
+            plant_provider.add_weed(detection)
+        candidates.append(np.mean([visited_candidates(plant_provider.weed_index, detection.position,
+                                                      WEED_MATCH_DISTANCE) for detection in detections[:1000]]))
+    assert len(plant_provider.weeds) > 80_000
+    assert candidates[-1] < 1.2 * candidates[0]
+
+
+@pytest.mark.benchmark
+def test_insert_100k_detections():
+    random.seed(0)
+    plant_provider = PlantProvider()
+    durations = []
+    for batch in range(10):
+        detections = row_detections(batch)
+        t = time.perf_counter()
+        for detection in detections:
+            plant_provider.add_weed(detection)
+        durations.append(time.perf_counter() - t)
+    assert durations[-1] < 3 * durations[0]
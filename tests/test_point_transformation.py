@@ -0,0 +1,33 @@
+import numpy as np
+from geographiclib.geodesic import Geodesic
+
+from field_friend.navigation.point_transformation import LocalProjection, wgs84_to_cartesian
+
+REFERENCES = [(51.983159, 7.434212), (-33.8688, 151.2093), (69.6492, 18.9553), (0.0, -45.0)]
+
+
+def random_points(reference: tuple[float, float], maximum_distance: float, count: int = 200) -> np.ndarray:
+    """Return points in WGS84 which are up to the given geodesic distance away from the reference."""
+    rng = np.random.default_rng(0)
+    points = []
+    for azimuth, distance in zip(rng.uniform(-180, 180, count), rng.uniform(0, maximum_distance, count)):
+        r = Geodesic.WGS84.Direct(reference[0], reference[1], azimuth, distance)
+        points.append((r['lat2'], r['lon2']))
+    return np.array(points)
+
+
+def test_to_cartesian_matches_geodesic_solution():
+    for reference in REFERENCES:
+        points = random_points(reference, 5000)
+        expected = np.array([wgs84_to_cartesian(reference, point) for point in points])
+        actual = LocalProjection(*reference).to_cartesian(points)
+        assert np.max(np.linalg.norm(actual - expected, axis=1)) < 0.001
+
+
+def test_to_wgs84_inverts_to_cartesian():
+    for reference in REFERENCES:
+        points = random_points(reference, 5000)
+        projection = LocalProjection(*reference)
+        restored = projection.to_wgs84(projection.to_cartesian(points))
+        errors = [Geodesic.WGS84.Inverse(*point, *point_)['s12'] for point, point_ in zip(points, restored)]
+        assert max(errors) < 0.000_01
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import rosys
+from rosys.geometry import Pose, Velocity
+
+from field_friend.navigation import PoseFilter
+
+
+@pytest.fixture
+def setup() -> SimpleNamespace:
+    wheels = SimpleNamespace(VELOCITY_MEASURED=rosys.event.Event())
+    gnss = SimpleNamespace(ROBOT_POSE_LOCATED=rosys.event.Event())
+    odometer = rosys.driving.Odometer(wheels)
+    pose_filter = PoseFilter(wheels, odometer, gnss)
+    return SimpleNamespace(wheels=wheels, gnss=gnss, odometer=odometer, pose_filter=pose_filter)
+
+
+def locate(setup: SimpleNamespace, x: float, y: float, yaw: float) -> None:
+    setup.pose_filter.handle_gnss_pose(Pose(x=x, y=y, yaw=yaw, time=rosys.time()))
+
+
+def test_first_gnss_pose_initializes_the_filter(setup: SimpleNamespace):
+    locate(setup, 1.0, 2.0, 0.5)
+    pose_filter = setup.pose_filter
+    assert pose_filter.is_initialized
+    assert (pose_filter.pose.x, pose_filter.pose.y, pose_filter.pose.yaw) == pytest.approx((1.0, 2.0, 0.5))
+    assert setup.odometer.prediction.point.distance(pose_filter.pose.point) < 1e-9
+
+
+def test_prediction_from_wheel_velocities(setup: SimpleNamespace):
+    locate(setup, 0.0, 0.0, np.pi / 2)
+    pose_filter = setup.pose_filter
+    start_time = pose_filter.pose.time
+    initial_variance = np.trace(pose_filter.covariance)
+    for i in range(11):
+        velocities = [Velocity(linear=0.5, angular=0.0, time=start_time + i * 0.1)]
+        setup.odometer.handle_velocities(velocities)
+        pose_filter.handle_velocities(velocities)
+    assert (pose_filter.pose.x, pose_filter.pose.y) == pytest.approx((0.0, 0.5), abs=1e-9)
+    assert pose_filter.pose.yaw == pytest.approx(np.pi / 2)
+    assert np.trace(pose_filter.covariance) > initial_variance
+
+
+def test_correction_towards_gnss_pose(setup: SimpleNamespace):
+    locate(setup, 0.0, 0.0, 0.0)
+    pose_filter = setup.pose_filter
+    initial_variance = np.trace(pose_filter.covariance)
+    locate(setup, 0.04, -0.02, 0.01)
+    assert 0.0 < pose_filter.pose.x < 0.04
+    assert -0.02 < pose_filter.pose.y < 0.0
+    assert 0.0 < pose_filter.pose.yaw < 0.01
+    assert np.trace(pose_filter.covariance) < initial_variance
+
+
+def test_outliers_are_rejected_until_they_persist(setup: SimpleNamespace):
+    locate(setup, 0.0, 0.0, 0.0)
+    pose_filter = setup.pose_filter
+    for _ in range(pose_filter.max_rejections - 1):
+        locate(setup, 1.0, 0.0, 0.0)
+        assert pose_filter.pose.x == 0.0
+    locate(setup, 1.0, 0.0, 0.0)
+    assert pose_filter.pose.x == pytest.approx(1.0)
+
+
+def test_gnss_pose_without_heading_only_corrects_the_position(setup: SimpleNamespace):
+    locate(setup, 0.0, 0.0, 0.3)
+    pose_filter = setup.pose_filter
+    yaw_variance = pose_filter.covariance[2, 2]
+    locate(setup, 0.03, 0.03, np.nan)
+    assert pose_filter.pose.yaw == pytest.approx(0.3)
+    assert pose_filter.pose.x > 0.0 and pose_filter.pose.y > 0.0
+    assert pose_filter.covariance[2, 2] == pytest.approx(yaw_variance)
+
+
+def test_reset_bypasses_the_outlier_gate(setup: SimpleNamespace):
+    locate(setup, 0.0, 0.0, 0.0)
+    pose_filter = setup.pose_filter
+    pose_filter.covariance *= 10
+    pose_filter.reset(Pose(x=100.0, y=-50.0, yaw=1.0))
+    assert (pose_filter.pose.x, pose_filter.pose.y, pose_filter.pose.yaw) == pytest.approx((100.0, -50.0, 1.0))
+    assert np.diag(pose_filter.covariance) == pytest.approx([pose_filter.position_std**2, pose_filter.position_std**2,
+                                                             pose_filter.heading_std**2])
+    assert setup.odometer.prediction.x == pytest.approx(100.0)
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+from rosys.geometry import Point
+
+from field_friend.automations import Plant, Row
+from field_friend.automations.row_crop_index import RowCropIndex
+
+ROW_POINTS = [Point(x=0.0, y=0.0), Point(x=4.0, y=0.0), Point(x=4.0, y=3.0), Point(x=8.0, y=3.0)]
+"""polyline with a left and a right turn; the vertices are at the stations 0, 4, 7 and 11"""
+
+
+def make_crop(crop_id: str, position: Point) -> Plant:
+    return Plant(id=crop_id, type='sugar_beet', position=position, detection_time=0.0)
+
+
+STATIONS = [0.6 + 0.25 * i for i in range(40)]
+"""crop stations, which are not at a vertex so that the lateral offset cannot move them onto another segment"""
+
+
+@pytest.fixture
+def index() -> RowCropIndex:
+    row = RowCropIndex(ROW_POINTS, [])
+    crops = [make_crop(f'crop-{i}', row.point_at(station, offset=0.02 * (-1) ** i))
+             for i, station in enumerate(STATIONS)]
+    random.Random(0).shuffle(crops)
+    return RowCropIndex(ROW_POINTS, crops)
+
+
+def test_crops_are_sorted_by_station(index: RowCropIndex):
+    assert index.stations == pytest.approx(STATIONS)
+    assert [crop.id for crop in index.crops] == [f'crop-{i}' for i in range(40)]
+    assert index.station(Point(x=4.0, y=1.5)) == pytest.approx(5.5)
+    assert index.station(Point(x=6.0, y=3.1)) == pytest.approx(9.0)
+
+
+def test_path_points_run_from_row_start_to_row_end(index: RowCropIndex):
+    points = index.path_points()
+    assert points[0] is ROW_POINTS[0] and points[-1] is ROW_POINTS[-1]
+    assert len(points) == len(ROW_POINTS) + len(index.crops)
+    assert all(vertex in points for vertex in ROW_POINTS)
+    stations = [index.station(point) for point in points]
+    assert stations == sorted(stations)
+    crop_positions = [point for point in points if point not in ROW_POINTS]
+    assert crop_positions == [crop.position for crop in index.crops]
+
+
+def test_between_respects_its_bounds(index: RowCropIndex):
+    assert [crop.id for crop in index.between(4.1, 5.1)] == ['crop-14', 'crop-15', 'crop-16', 'crop-17', 'crop-18']
+    assert [crop.id for crop in index.between(4.11, 5.09)] == ['crop-15', 'crop-16', 'crop-17']
+    assert index.between(0.0, 0.59) == []
+    assert index.between(10.4, 20.0) == []
+    assert index.between(5.0, 4.0) == []
+    assert index.between(-1.0, 20.0) == index.crops
+
+
+def test_nearest_is_limited_by_the_tolerance(index: RowCropIndex):
+    assert index.nearest(index.point_at(6.15), tolerance=0.1).id == 'crop-22'
+    assert index.nearest(index.point_at(6.3, offset=0.5), tolerance=0.1).id == 'crop-23'
+    assert index.nearest(index.point_at(0.4), tolerance=0.1) is None
+    assert index.nearest(index.point_at(11.0), tolerance=0.5) is None
+    assert index.nearest(index.point_at(6.225), tolerance=0.1) is None
+
+
+def test_insert_keeps_row_crops_sorted():
+    row = Row(id='row', name='row', points_wgs84=[[51.0, 7.0], [51.0, 7.0001], [51.0001, 7.0002], [51.0001, 7.0004]])
+    reference = [51.0, 7.0]
+    index = row.crop_index(reference)
+    for i, station in enumerate(random.Random(1).sample([0.2 * i for i in range(1, 60)], 40)):
+        index.insert(make_crop(f'crop-{i}', index.point_at(station, offset=0.01)))
+    assert row.crop_index(reference) is index
+    stations = [index.station(crop.position) for crop in row.crops]
+    assert len(row.crops) == 40
+    assert stations == sorted(stations)
+    assert stations == pytest.approx(index.stations)
+    index.remove(row.crops[10])
+    assert len(row.crops) == 39 and index.is_valid
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from rosys.geometry import Point, Pose
+
+from field_friend.automations import Plant
+from field_friend.automations.row_crop_index import RowCropIndex
+from field_friend.automations.row_schedule import RowActionPlanner
+from field_friend.automations.weeding_new import WeedingNew
+
+DRILL_REACH = np.array([0.10, 0.15, -0.12, 0.12])
+"""drill center 0.125 m in front of the robot with a radius of 0.025 m"""
+CHOP_REACH = np.array([0.0, 0.3, -0.12, 0.12])
+"""chop center 0.15 m in front of the robot with a radius of 0.15 m"""
+
+
+def plant(plant_id: str, x: float, y: float, plant_type: str = 'weed') -> Plant:
+    return Plant(id=plant_id, type=plant_type, position=Point(x=x, y=y), detection_time=0.0)
+
+
+def create_planner(crops: list[Plant], *, chop: bool = False) -> RowActionPlanner:
+    reach_areas = {'drill': DRILL_REACH, 'chop': CHOP_REACH} if chop else {'drill': DRILL_REACH}
+    return RowActionPlanner(RowCropIndex([Point(x=0, y=0), Point(x=10, y=0)], crops), reach_areas,
+                            depth=lambda _: 0.05, margin=0.01)
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_stops_are_in_driving_order(reverse: bool):
+    weeds = [plant('c', 3.0, 0.05), plant('a', 1.0, -0.05), plant('b', 2.0, 0.0)]
+    actions = create_planner([]).plan(weeds, reverse=reverse)
+    expected = [('a', 1.025), ('b', 2.025), ('c', 3.025)]
+    if reverse:
+        expected.reverse()
+    assert [(action.plant_ids[0], action.station) for action in actions] == \
+        [(plant_id, pytest.approx(station)) for plant_id, station in expected]
+    assert all(action.tool == 'drill' and action.depth == 0.05 for action in actions)
+
+
+def test_weeds_within_reach_share_a_stop():
+    weeds = [plant('a', 1.0, 0.08), plant('b', 1.03, -0.06), plant('c', 1.04, -0.05), plant('d', 1.2, 0.0)]
+    actions = create_planner([]).plan(weeds)
+    assert [action.station for action in actions[:2]] == pytest.approx([1.025, 1.025])
+    assert actions[0].plant_ids == ['b', 'c'] and actions[0].y < actions[1].y
+    assert actions[1].plant_ids == ['a']
+    assert actions[2].plant_ids == ['d'] and actions[2].station == pytest.approx(1.225)
+
+
+def test_weeds_close_to_crops_are_not_chopped():
+    crops = [plant('crop', 2.0, 0.0, 'sugar_beet')]
+    weeds = [plant('near', 1.95, 0.05), plant('far', 5.0, 0.05), plant('touching', 2.0, 0.01)]
+    actions = create_planner(crops, chop=True).plan(weeds)
+    chopped = [weed_id for action in actions if action.tool == 'chop' for weed_id in action.plant_ids]
+    drilled = [weed_id for action in actions if action.tool == 'drill' for weed_id in action.plant_ids]
+    assert chopped == ['far']
+    assert sorted(drilled) == ['near', 'touching']
+    assert [action.tool for action in actions] == ['drill', 'chop']  # both punches are merged at the same stop
+    crop_distances = [np.hypot(action.station - 2.0, action.y) for action in actions if action.tool == 'drill']
+    assert min(crop_distances) >= 0.025 + 0.01
+
+
+def test_passed_stop_is_still_due():
+    crop_index = RowCropIndex([Point(x=0, y=0), Point(x=10, y=0)], [])
+    planner = create_planner([])
+    actions = planner.plan([plant('a', 1.0, 0.0), plant('b', 1.02, 0.05), plant('c', 2.0, 0.0)])
+    weeding = WeedingNew.__new__(WeedingNew)
+    weeding.braking_distance = 0.02
+    weeding.schedule_interval = 0.01
+    odometer = SimpleNamespace(prediction=Pose(x=0.0, y=0.0, yaw=0.0), current_velocity=SimpleNamespace(linear=0.1))
+    weeding.system = SimpleNamespace(odometer=odometer)
+    tool_x = planner.tool_x['drill']
+
+    odometer.prediction = Pose(x=1.025 - tool_x - 0.1, y=0.0, yaw=0.0)
+    assert weeding._due_actions(actions, crop_index, planner) == []
+
+    odometer.prediction = Pose(x=1.025 - tool_x - 0.02, y=0.0, yaw=0.0)
+    assert [action.plant_ids for action in weeding._due_actions(actions, crop_index, planner)] == [['a'], ['b']]
+
+    odometer.prediction = Pose(x=1.025 - tool_x + 0.3, y=0.0, yaw=0.0)
+    due = weeding._due_actions(actions, crop_index, planner)
+    assert [action.station for action in due] == pytest.approx([1.025, 1.025])
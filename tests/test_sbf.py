@@ -0,0 +1,85 @@
+import binascii
+import math
+import random
+import struct
+
+import pytest
+
+from field_friend.navigation.nmea import NmeaParser
+from field_friend.navigation.sbf import (ATT_EULER, ATT_EULER_ID, GPS_EPOCH, LEAP_SECONDS, PVT_GEODETIC,
+                                         PVT_GEODETIC_ID, SECONDS_PER_WEEK, SbfParser)
+
+WEEK = 2300
+LATITUDE = 51.983159
+LONGITUDE = 7.434212
+
+
+def block(block_id: int, body: bytes) -> bytes:
+    """Frame a block body with sync, CRC, ID and length like the receiver does."""
+    body += bytes(-(len(body) + 8) % 4)
+    header = struct.pack('<HH', block_id, len(body) + 8)
+    return b'$@' + struct.pack('<H', binascii.crc_hqx(header + body, 0)) + header + body
+
+
+def pvt(tow: int, mode: int = 4) -> bytes:
+    return block(PVT_GEODETIC_ID, PVT_GEODETIC.pack(tow, WEEK, mode, 0, math.radians(LATITUDE),
+                                                    math.radians(LONGITUDE), 100.0, 47.0, 0.3, 0.4, 0.0, 0.0))
+
+
+def att(tow: int, heading: float) -> bytes:
+    return block(ATT_EULER_ID, ATT_EULER.pack(tow, WEEK, 2, 0, 0, 0, heading, 0.0, 0.0, 0.0, 0.0, 0.0))
+
+
+@pytest.fixture
+def stream() -> bytes:
+    """Ten epochs at 10 Hz with position and attitude blocks and an interleaved NMEA sentence."""
+    data = b''
+    for i in range(10):
+        tow = 123_456_000 + i * 100
+        data += pvt(tow) + att(tow, heading=10.0 * i)
+        data += b'$GPHDT,123.4,T*31\r\n'
+    return data
+
+
+def decode(parser: SbfParser, data: bytes, chunk_sizes: list[int]) -> list:
+    epochs = []
+    position = 0
+    for size in chunk_sizes:
+        epochs.extend(parser.feed(data[position:position + size]))
+        position += size
+    epochs.extend(parser.feed(data[position:]))
+    return epochs
+
+
+def test_epochs_are_decoded(stream: bytes):
+    epochs = SbfParser().feed(stream)
+    assert len(epochs) == 10
+    for i, epoch in enumerate(epochs):
+        assert epoch.timestamp == pytest.approx(GPS_EPOCH + WEEK * SECONDS_PER_WEEK + 123_456 + i / 10 - LEAP_SECONDS)
+        assert epoch.latitude == pytest.approx(LATITUDE) and epoch.longitude == pytest.approx(LONGITUDE)
+        assert epoch.gps_qual == 4 and epoch.mode == 'R'
+        assert epoch.heading == pytest.approx(10.0 * i)
+        assert epoch.speed_kmh == pytest.approx(1.8)
+
+
+def test_decoding_does_not_depend_on_chunk_boundaries(stream: bytes):
+    expected = SbfParser().feed(stream)
+    rng = random.Random(0)
+    for _ in range(20):
+        assert decode(SbfParser(), stream, [rng.randint(1, 40) for _ in range(50)]) == expected
+
+
+def test_stray_dollar_bytes_do_not_swallow_blocks(stream: bytes):
+    expected = SbfParser(NmeaParser()).feed(stream)
+    noisy = b''.join(b'$\x17\x00' + stream[i:i + 1] if stream[i:i + 2] == b'$@' else stream[i:i + 1]
+                     for i in range(len(stream)))
+    assert SbfParser(NmeaParser()).feed(noisy) == expected
+
+
+def test_corrupted_blocks_are_skipped(stream: bytes):
+    corrupted = bytearray(stream)
+    corrupted[20] ^= 0xff  # inside the position block of the first epoch
+    parser = SbfParser()
+    epochs = parser.feed(bytes(corrupted))
+    assert parser.errors >= 1
+    assert [epoch.time for epoch in epochs] == [123_456_000 + i * 100 for i in range(1, 10)]
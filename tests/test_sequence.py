@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pytest
+
+from field_friend.automations import find_lane_order, find_sequence
+from field_friend.automations.sequence import _greedy_order, _improve_order, _order_cost
+
+
+def transit_costs(offsets: np.ndarray, minimum_distance: float) -> np.ndarray:
+    """Lateral transit distance with the same penalty for narrow turns as `find_lane_order`."""
+    gaps = np.abs(offsets[:, None] - offsets[None, :])
+    return gaps + np.where(gaps < minimum_distance - 1e-9, 2 * minimum_distance + np.ptp(offsets), 0.0)
+
+
+def irregular_offsets(number_of_lanes: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.uniform(0.3, 1.2, number_of_lanes))
+
+
+@pytest.mark.parametrize('number_of_lanes', [20, 80, 250])
+@pytest.mark.parametrize('minimum_distance', [1.0, 2.0])
+def test_equally_spaced_lanes(number_of_lanes: int, minimum_distance: float):
+    offsets = np.arange(number_of_lanes) * 0.5
+    order = find_lane_order(offsets, minimum_distance=minimum_distance)
+    assert sorted(order) == list(range(number_of_lanes))
+    assert order[0] == 0
+    costs = transit_costs(offsets, minimum_distance)
+    baselines = [list(range(number_of_lanes)),
+                 find_sequence(number_of_lanes, minimum_distance=int(minimum_distance / 0.5)),
+                 _greedy_order(costs, 0)]
+    assert _order_cost(costs, order) <= min(_order_cost(costs, b) for b in baselines if b) + 1e-6
+
+
+@pytest.mark.parametrize('number_of_lanes', [20, 80, 250])
+def test_irregular_lanes(number_of_lanes: int):
+    offsets = irregular_offsets(number_of_lanes)
+    order = find_lane_order(offsets, minimum_distance=1.5, start=3)
+    assert sorted(order) == list(range(number_of_lanes))
+    assert order[0] == 3
+    costs = transit_costs(offsets, 1.5)
+    serpentine = [3] + [i for i in range(number_of_lanes) if i != 3]
+    assert _order_cost(costs, order) <= _order_cost(costs, serpentine) + 1e-6
+    assert _order_cost(costs, order) <= _order_cost(costs, _greedy_order(costs, 3)) + 1e-6
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_improvement_never_lengthens_the_greedy_order(seed: int):
+    offsets = irregular_offsets(60, seed)
+    costs = transit_costs(offsets, 1.5)
+    for start in (0, 17, 59):
+        greedy = _greedy_order(costs, start)
+        improved = _improve_order(costs, greedy)
+        assert sorted(improved) == list(range(60))
+        assert improved[0] == start
+        assert _order_cost(costs, improved) <= _order_cost(costs, greedy) + 1e-9
+
+
+def test_improvement_stops_after_max_iterations():
+    rng = np.random.default_rng(1)
+    offsets = irregular_offsets(40, seed=1)
+    costs = transit_costs(offsets, 1.5)
+    order = [0] + [int(i) for i in rng.permutation(np.arange(1, 40))]
+    assert _improve_order(costs, order, max_iterations=0) == order
+    single_sweeps = [order]
+    for _ in range(4):
+        single_sweeps.append(_improve_order(costs, single_sweeps[-1], max_iterations=1))
+    for iterations, expected in enumerate(single_sweeps):
+        assert _improve_order(costs, order, max_iterations=iterations) == expected
+    assert _order_cost(costs, single_sweeps[1]) > _order_cost(costs, single_sweeps[2])
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('number_of_lanes', [250, 500])
+def test_lane_order_duration(number_of_lanes: int):
+    offsets = irregular_offsets(number_of_lanes)
+    t = time.perf_counter()
+    find_lane_order(offsets, minimum_distance=1.5)
+    assert time.perf_counter() - t < 5.0